@@ -0,0 +1,46 @@
+# archive.py
+# Move old, closed and fine-settled loans from transactions to transactions_archive.
+#
+#   python archive.py                        # loans returned more than ARCHIVE_AFTER_DAYS ago
+#   python archive.py --older-than-days 730 --batch-size 10000
+#   python archive.py --dry-run              # only count what would move
+#
+# Meant to run from cron (e.g. nightly) against the same DATABASE_URL as the app. Each
+# batch is its own transaction, so the app keeps serving while it runs and an
+# interrupted run simply resumes next time. Running servers see the move through
+# the shared cache versions.
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from main import (
+    SessionLocal, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archivable, archive_transactions, response_cache,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed, fine-settled transactions")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            cutoff = date.today() - timedelta(days=args.older_than_days)
+            count = db.execute(select(func.count()).where(archivable(cutoff))).scalar()
+            print(f"{count} loans returned before {cutoff} would be archived")
+            return 0
+        moved = archive_transactions(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    finally:
+        db.close()
+    if moved:
+        response_cache.bump("transactions")
+    print(f"Archived {moved} loans")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
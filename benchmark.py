@@ -0,0 +1,637 @@
+# benchmark.py
+# Query, route and concurrency benchmarks, printed as JSON.
+#
+#   python benchmark.py --books 5000 --open-loans 3000 --concurrency 32 --duration 10
+#   python benchmark.py --scenario profiles --readers 8 --writers 4 --duration 10
+#   python benchmark.py --scenario double-issue --threads 16 --contended-books 50
+#   python benchmark.py --scenario queries --scale 100k --rounds 30 --output queries.json
+#   python benchmark.py --scenario routes --scale 10k --compare routes-baseline.json
+#   python benchmark.py --scenario templates --cold-starts 5
+#
+# "queries" seeds a seed_data.py data set and times the query/circulation functions
+# in main directly; "routes" seeds one and times every report plus login,
+# check-availability and issue/return over HTTP against a uvicorn subprocess, with
+# the response cache off so each hit renders. Both report min/median/mean/p95 per
+# benchmark. --output saves the JSON; --compare flags every median (median_ms, or
+# p50_ms in "mixed") that got more than --threshold slower than in a saved run and
+# exits 1. tests/test_benchmarks.py times the same "queries" set under pytest-benchmark
+# on a small data set, for --benchmark-compare runs alongside the test suite.
+#
+# "templates" times cold starts in fresh interpreters (importing main, then compiling
+# every template from source with an empty bytecode cache and again from the cache
+# the first start filled), and per-render time of each static page rendered by Jinja
+# versus served from main.static_page's per-role cache.
+#
+# "mixed" seeds a throw-away SQLite database (DATABASE_URL is pointed at a temp
+# file before main is imported), serves it from a uvicorn subprocess and drives
+# report and issue/return traffic. The "probe" entry is the latency of the static
+# start page while the reports run; it shows whether slow handlers stall the event loop.
+#
+# "profiles" runs report readers against issue/return writers directly on the
+# engine, once per DB_PROFILE in main.ENGINE_PROFILES, to compare journal modes.
+#
+# "double-issue" has every thread try to issue the same books at the same time
+# and exits non-zero unless each book ended up issued exactly once.
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("benchmark.py needs httpx: pip install httpx")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/benchmark.db")
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import main
+import seed_data
+
+AUTH = ("admin", "admin")
+REGRESSION_METRICS = ("median_ms", "p50_ms")  # tails and maxima are too noisy to gate on
+REPORT_URLS = [
+    "/reports/master-books",
+    "/reports/master-movies",
+    "/reports/master-memberships",
+    "/reports/active-issues",
+    "/reports/overdue",
+    "/reports/pending-issues",
+    "/reports/summary",
+    "/transactions/return-book",
+]
+STATIC_TEMPLATES = [
+    "start.html", "login.html", "book_categories.html", "maintenance_menu.html", "reports_menu.html",
+    "maintenance_manage.html", "add_book.html", "add_membership.html", "add_user.html", "check_availability.html",
+]
+COLD_START_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+count = main.warm_templates()
+print(json.dumps({"import_s": imported - started, "warm_s": time.perf_counter() - imported, "templates": count}))
+"""
+
+def init_db():
+    # init_db reports what it created on stdout, which is reserved for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        main.init_db()
+
+def seed(session_factory, books, members, open_loans):
+    db = session_factory()
+    try:
+        today = date.today()
+        db.bulk_insert_mappings(main.Membership, [
+            {
+                "first_name": f"Member{i}", "last_name": "Bench", "contact_name": "", "contact_address": "",
+                "aadhar_card": f"BENCH{i:08d}", "start_date": today, "end_date": today + timedelta(days=365),
+                "membership_type": "1 year",
+            }
+            for i in range(members)
+        ])
+        db.bulk_insert_mappings(main.Book, [
+            {
+                "title": f"Benchmark Title {i}", "author": f"Author {i % 500}", "is_movie": i % 10 == 0,
+                "genre": "Fiction", "serial_number": f"BENCH{i:08d}",
+                "status": "Issued" if i < open_loans else "Available",
+            }
+            for i in range(books)
+        ])
+        main.attach_copies(db)
+        db.bulk_insert_mappings(main.Transaction, [
+            {
+                "book_id": i + 1, "member_id": i % members + 1, "issue_date": today - timedelta(days=20),
+                "return_date": today - timedelta(days=i % 10), "fine_amount": 0.0, "fine_paid": False,
+            }
+            for i in range(open_loans)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def start_server(**env):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(base_url + "/")
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+def open_transaction_id(book_id):
+    db = main.SessionLocal()
+    try:
+        return db.query(main.Transaction.id).filter(
+            main.Transaction.book_id == book_id, main.Transaction.actual_return_date == None
+        ).scalar()
+    finally:
+        db.close()
+
+async def report_worker(client, deadline, latencies, index):
+    while time.perf_counter() < deadline:
+        url = REPORT_URLS[index % len(REPORT_URLS)]
+        index += 1
+        started = time.perf_counter()
+        response = await client.get(url)
+        response.raise_for_status()
+        latencies.setdefault(url, []).append(time.perf_counter() - started)
+
+async def probe_worker(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/")
+        response.raise_for_status()
+        latencies.setdefault("probe", []).append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+async def circulation_worker(client, deadline, latencies, book_id, member_id):
+    today = date.today()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/transactions/issue-book", data={
+            "book_id": book_id, "member_id": member_id,
+            "issue_date": today.isoformat(), "return_date": (today + timedelta(days=7)).isoformat(),
+        })
+        latencies.setdefault("issue", []).append(time.perf_counter() - started)
+        transaction_id = await asyncio.to_thread(open_transaction_id, book_id)
+        if response.status_code != 303 or transaction_id is None:
+            raise RuntimeError(f"issue of book {book_id} failed: {response.status_code} {response.headers.get('location')}")
+
+        started = time.perf_counter()
+        response = await client.post("/transactions/return-book", data={
+            "transaction_id": transaction_id, "actual_return_date": today.isoformat(),
+        })
+        latencies.setdefault("return", []).append(time.perf_counter() - started)
+
+def summarise(latencies, elapsed):
+    result = {}
+    for name, samples in sorted(latencies.items()):
+        samples = sorted(samples)
+        result[name] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(statistics.median(samples) * 1000, 2),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 2) if len(samples) >= 20 else None,
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+    return result
+
+async def run_mixed(base_url, concurrency, duration, circulation_share, first_free_book):
+    circulation = max(1, int(concurrency * circulation_share))
+    latencies = {}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, auth=AUTH, limits=limits, timeout=60) as client:
+        await client.get("/reports")  # warm the credential cache
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        workers = [report_worker(client, deadline, latencies, i) for i in range(concurrency - circulation)]
+        workers += [
+            circulation_worker(client, deadline, latencies, book_id=first_free_book + i, member_id=i + 1)
+            for i in range(circulation)
+        ]
+        workers.append(probe_worker(client, deadline, latencies))
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - started
+    total = sum(len(samples) for samples in latencies.values())
+    return {"elapsed_s": round(elapsed, 2), "total_rps": round(total / elapsed, 1), "routes": summarise(latencies, elapsed)}
+
+def profile_reader(session_factory, deadline, counts):
+    while time.perf_counter() < deadline:
+        db = session_factory()
+        try:
+            main.open_transactions_report(db)
+            counts["reads"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+        finally:
+            db.close()
+
+def profile_writer(session_factory, deadline, counts, book_id, member_id):
+    today = date.today()
+    while time.perf_counter() < deadline:
+        db = session_factory()
+        try:
+            book = db.get(main.Book, book_id)
+            book.status = "Issued"
+            transaction = main.Transaction(
+                book_id=book_id, member_id=member_id, issue_date=today, return_date=today + timedelta(days=7)
+            )
+            db.add(transaction)
+            db.commit()
+            transaction.actual_return_date = today
+            book.status = "Available"
+            db.commit()
+            counts["writes"] += 2
+        except OperationalError:
+            db.rollback()
+            counts["errors"] += 1
+        finally:
+            db.close()
+
+def run_profiles(args):
+    results = {}
+    for profile in main.ENGINE_PROFILES:
+        engine = main.build_engine(f"sqlite:///{tempfile.mkdtemp()}/profile.db", profile)
+        main.Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, args.books, args.members, args.open_loans)
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        deadline = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=profile_reader, args=(session_factory, deadline, counts))
+                   for _ in range(args.readers)]
+        threads += [threading.Thread(target=profile_writer,
+                                     args=(session_factory, deadline, counts, args.open_loans + i + 1, i + 1))
+                    for i in range(args.writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+        results[profile] = {
+            "reads_per_s": round(counts["reads"] / elapsed, 1),
+            "writes_per_s": round(counts["writes"] / elapsed, 1),
+            "lock_errors": counts["errors"],
+        }
+    return results
+
+def double_issue_worker(barrier, book_ids, member_id, outcome, lock):
+    today = date.today()
+    book_ids = list(book_ids)
+    random.shuffle(book_ids)
+    won = lost = 0
+    barrier.wait()
+    for book_id in book_ids:
+        db = main.SessionLocal()
+        try:
+            main.issue_copy(db, book_id, member_id, today, today + timedelta(days=7))
+            db.commit()
+            won += 1
+        except (main.CirculationError, OperationalError):
+            db.rollback()
+            lost += 1
+        finally:
+            db.close()
+    with lock:
+        outcome["won"] += won
+        outcome["lost"] += lost
+
+def run_double_issue(args):
+    init_db()
+    seed(main.SessionLocal, args.books, args.members, open_loans=0)
+    book_ids = range(1, args.contended_books + 1)
+    outcome = {"won": 0, "lost": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+    threads = [threading.Thread(target=double_issue_worker, args=(barrier, book_ids, i % args.members + 1, outcome, lock))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = main.SessionLocal()
+    try:
+        issues_per_book = dict(db.query(main.Transaction.book_id, main.func.count()).group_by(main.Transaction.book_id).all())
+        issued_status = db.query(main.Book).filter(main.Book.id.in_(book_ids), main.Book.status == "Issued").count()
+    finally:
+        db.close()
+    double_issued = sorted(book_id for book_id, count in issues_per_book.items() if count > 1)
+    return {
+        "threads": args.threads,
+        "contended_books": args.contended_books,
+        "attempts": args.threads * args.contended_books,
+        "won": outcome["won"],
+        "lost": outcome["lost"],
+        "elapsed_s": round(elapsed, 2),
+        "books_issued_once": sum(1 for count in issues_per_book.values() if count == 1),
+        "books_with_issued_status": issued_status,
+        "double_issued": double_issued,
+        "ok": not double_issued and outcome["won"] == args.contended_books == issued_status,
+    }
+
+def timing_stats(samples):
+    samples = sorted(samples)
+    return {
+        "rounds": len(samples),
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+        "stddev_ms": round(statistics.pstdev(samples) * 1000, 3),
+    }
+
+def time_rounds(function, rounds, warmup=1):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return timing_stats(samples)
+
+def seed_scale(args):
+    init_db()
+    sizes = seed_data.SCALES[args.scale]
+    started = time.perf_counter()
+    result = seed_data.populate(main.engine, **sizes, seed=args.seed)
+    return {**result, "seed_s": round(time.perf_counter() - started, 2)}
+
+def query_benchmarks(db, data):
+    """name -> zero-argument callable, each one a query or circulation path used by the app."""
+    free_book = data["open_loans"] + 1
+    today = date.today()
+    deep_cursor = main.encode_cursor("Storm", 0)
+    month_end = main.month_end(today)
+    year_start = main.add_months(today, -11)
+
+    def issue_and_return():
+        transaction = main.issue_copy(db, free_book, 1, today, today + timedelta(days=7))
+        db.commit()
+        main.return_copies(db, [main.BatchReturnItem(transaction_id=transaction.id, actual_return_date=today)])
+        db.commit()
+
+    # A hold is only taken while no copy of the title is on the shelf, so lend out
+    # free_book's sibling copies once, outside the timed rounds
+    work_id = db.get(main.Book, free_book).work_id
+    siblings = db.query(main.Book.id).filter(main.Book.work_id == work_id, main.Book.id != free_book, main.Book.status == "Available")
+    for sibling in [row.id for row in siblings]:
+        main.issue_copy(db, sibling, 3, today, today + timedelta(days=7))
+    db.commit()
+
+    def return_to_hold():
+        # The return hands the copy to member 2's hold, who then collects it
+        transaction = main.issue_copy(db, free_book, 1, today, today + timedelta(days=7))
+        main.place_hold(db, free_book, 2)
+        db.commit()
+        main.return_copies(db, [main.BatchReturnItem(transaction_id=transaction.id, actual_return_date=today)])
+        db.commit()
+        transaction = main.issue_copy(db, free_book, 2, today, today + timedelta(days=7))
+        db.commit()
+        main.return_copies(db, [main.BatchReturnItem(transaction_id=transaction.id, actual_return_date=today)])
+        db.commit()
+
+    return {
+        "search_books": lambda: main.search_books(db, title="silent river"),
+        "search_books_author": lambda: main.search_books(db, author="priya"),
+        "search_works": lambda: main.search_works(db, title="silent river"),
+        "search_members": lambda: main.search_members(db, "priya sh"),
+        "books_page_by_id": lambda: main.keyset_page(
+            db.query(main.Book).filter(main.Book.is_movie == False), main.Book, main.BOOK_SORT_KEYS),
+        "works_page_by_title_deep": lambda: main.keyset_page(
+            db.query(main.Work).filter(main.Work.is_movie == False, main.Work.copies > 0), main.Work, main.WORK_SORT_KEYS,
+            sort="title", after=deep_cursor),
+        "books_page_by_title_deep": lambda: main.keyset_page(
+            db.query(main.Book).filter(main.Book.is_movie == False), main.Book, main.BOOK_SORT_KEYS,
+            sort="title", after=deep_cursor),
+        "memberships_page_by_name": lambda: main.keyset_page(
+            db.query(main.Membership), main.Membership, main.MEMBERSHIP_SORT_KEYS, sort="name"),
+        "member_history": lambda: main.keyset_page(
+            main.member_history_query(db, 1), main.history.c, main.HISTORY_SORT_KEYS, "issue_date", descending=True),
+        "top_titles_whole_months": lambda: main.top_borrowed(db, "title", year_start, month_end),
+        "top_genres_date_range": lambda: main.top_borrowed(db, "genre", year_start + timedelta(days=3), today),
+        "fines_by_month": lambda: main.fines_by_month(db, year_start, month_end),
+        "active_issues": lambda: main.open_transactions_report(db),
+        "overdue": lambda: main.open_transactions_report(db, overdue=True),
+        "library_summary": lambda: main.library_summary(db),
+        "sweep_overdue": lambda: main.sweep_overdue(db),
+        "issue_and_return": issue_and_return,
+        "return_to_hold": return_to_hold,
+        "open_holds": lambda: main.open_holds(db),
+    }
+
+def run_queries(args, data):
+    db = main.SessionLocal()
+    try:
+        return {name: time_rounds(function, args.rounds) for name, function in query_benchmarks(db, data).items()}
+    finally:
+        db.close()
+
+def run_routes(args, data):
+    today = date.today().isoformat()
+    free_book = data["open_loans"] + 1
+    server, base_url = start_server(RESPONSE_CACHE_SIZE="0", OVERDUE_SWEEP_INTERVAL="0")
+    try:
+        with httpx.Client(base_url=base_url, auth=AUTH, timeout=120) as client:
+            def get(url):
+                return lambda: client.get(url).raise_for_status()
+
+            def post(url, data, expect=200):
+                def request():
+                    response = client.post(url, data=data)
+                    if response.status_code != expect:
+                        raise RuntimeError(f"POST {url}: {response.status_code} {response.headers.get('location')}")
+                return request
+
+            def issue_and_return():
+                post("/transactions/issue-book", {
+                    "book_id": free_book, "member_id": 1, "issue_date": today, "return_date": today,
+                }, expect=303)()
+                transaction_id = open_transaction_id(free_book)
+                post("/transactions/return-book", {"transaction_id": transaction_id, "actual_return_date": today}, expect=303)()
+
+            benchmarks = {url: get(url) for url in REPORT_URLS}
+            benchmarks.update({
+                "/reports/active-issues?stream=true": get("/reports/active-issues?stream=true"),
+                "/admin": get("/admin"),
+                "/reports/analytics": get("/reports/analytics"),
+                "/reports/member-history/1": get("/reports/member-history/1"),
+                "/reports/pending-issues": get("/reports/pending-issues"),
+                "/api/v1/books?limit=100": get("/api/v1/books?limit=100"),
+                "/transactions/member-search?q=pri": get("/transactions/member-search?q=pri"),
+                "POST /login": post("/login", {"username": AUTH[0], "password": AUTH[1]}, expect=303),
+                "POST /transactions/check-availability": post("/transactions/check-availability", {"title": "silent"}),
+                "issue_and_return": issue_and_return,
+            })
+            return {name: time_rounds(function, args.rounds) for name, function in benchmarks.items()}
+    finally:
+        server.terminate()
+        server.wait()
+
+def cold_start(cache_dir):
+    finished = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "TEMPLATE_CACHE_DIR": cache_dir, "TEMPLATE_AUTO_RELOAD": "0"},
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(finished.stdout.splitlines()[-1])
+
+def run_templates(args):
+    starts = {"source": [], "bytecode": []}
+    for _ in range(args.cold_starts):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            starts["source"].append(cold_start(cache_dir))
+            starts["bytecode"].append(cold_start(cache_dir))
+    cold = {
+        kind: {
+            "templates": runs[0]["templates"],
+            "import": timing_stats([run["import_s"] for run in runs]),
+            "warm_templates": timing_stats([run["warm_s"] for run in runs]),
+        }
+        for kind, runs in starts.items()
+    }
+
+    main.warm_templates()
+    request = main.Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
+    renders = {}
+    for name in STATIC_TEMPLATES:
+        template = main.templates.get_template(name)
+        renders[name] = {
+            "jinja": time_rounds(lambda: template.render(request=request, is_admin=True), args.rounds),
+            "cached": time_rounds(lambda: main.static_page(request, name, True), args.rounds),
+        }
+    return {"cold_start": cold, "render": renders}
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlite": main.sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "db_profile": main.DB_PROFILE,
+    }
+
+def compare(result, baseline, threshold, path=()):
+    """Every REGRESSION_METRICS figure in ``result`` more than ``threshold`` slower than in ``baseline``."""
+    regressions = []
+    for key, value in result.items():
+        if key not in baseline:
+            continue
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            regressions += compare(value, baseline[key], threshold, path + (key,))
+        elif key in REGRESSION_METRICS and isinstance(value, (int, float)) and baseline[key]:
+            if value > baseline[key] * (1 + threshold):
+                regressions.append({
+                    "metric": "/".join(path + (key,)), "baseline": baseline[key], "current": value,
+                    "change": f"+{(value / baseline[key] - 1) * 100:.0f}%",
+                })
+    return regressions
+
+def report(result, args):
+    """Print ``result`` as JSON, save it with --output and check it against --compare."""
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.threshold)
+        result = {**result, "regressions": regressions}
+        exit_code = 1 if regressions else 0
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+    return exit_code
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Mixed report and issue/return concurrency benchmark")
+    parser.add_argument("--scenario", choices=["mixed", "profiles", "double-issue", "queries", "routes", "templates"], default="mixed")
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--open-loans", type=int, default=3000, help="issued books seeded before the run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--circulation-share", type=float, default=0.25,
+                        help="fraction of workers doing issue/return instead of reports")
+    parser.add_argument("--readers", type=int, default=8, help="report reader threads (profiles scenario)")
+    parser.add_argument("--writers", type=int, default=4, help="issue/return writer threads (profiles scenario)")
+    parser.add_argument("--threads", type=int, default=16, help="competing clerks (double-issue scenario)")
+    parser.add_argument("--contended-books", type=int, default=50, help="books every clerk tries to issue (double-issue scenario)")
+    parser.add_argument("--scale", choices=sorted(seed_data.SCALES), default="10k", help="seed_data.py data set (queries/routes)")
+    parser.add_argument("--seed", type=int, default=42, help="seed_data.py random seed (queries/routes)")
+    parser.add_argument("--rounds", type=int, default=20, help="timed rounds per benchmark (queries/routes/templates)")
+    parser.add_argument("--cold-starts", type=int, default=5, help="fresh interpreters to time (templates scenario)")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="JSON result of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.scenario in ("queries", "routes"):
+        data = seed_scale(args)
+        run = run_queries if args.scenario == "queries" else run_routes
+        sys.exit(report({
+            "scenario": args.scenario,
+            "scale": args.scale,
+            "environment": environment(),
+            "data": data,
+            "benchmarks": run(args, data),
+        }, args))
+
+    if args.scenario == "templates":
+        sys.exit(report({
+            "scenario": args.scenario,
+            "environment": environment(),
+            "benchmarks": run_templates(args),
+        }, args))
+
+    if args.open_loans + max(args.concurrency, args.writers) > args.books:
+        parser.error("--books must exceed --open-loans by at least --concurrency/--writers")
+
+    if args.scenario == "double-issue":
+        result = run_double_issue(args)
+        exit_code = report(result, args)
+        sys.exit(exit_code or (0 if result["ok"] else 1))
+
+    if args.scenario == "profiles":
+        sys.exit(report({
+            "books": args.books,
+            "open_loans": args.open_loans,
+            "readers": args.readers,
+            "writers": args.writers,
+            "profiles": run_profiles(args),
+        }, args))
+
+    init_db()
+    seed(main.SessionLocal, args.books, args.members, args.open_loans)
+    server, base_url = start_server()
+    try:
+        mixed = asyncio.run(run_mixed(
+            base_url, args.concurrency, args.duration, args.circulation_share, first_free_book=args.open_loans + 1
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    sys.exit(report({
+        "database_url": main.DATABASE_URL,
+        "books": args.books,
+        "members": args.members,
+        "open_loans": args.open_loans,
+        "concurrency": args.concurrency,
+        "mixed": mixed,
+    }, args))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,55 @@
+# catalogue.py
+# Bulk catalogue import/export from the command line.
+#
+#   python catalogue.py import new_branch.csv
+#   python catalogue.py import new_branch.jsonl --batch-size 5000
+#   python catalogue.py export books --format jsonl > books.jsonl
+#
+# Uses the same DATABASE_URL / DB_PROFILE settings and import code as the web app.
+
+import argparse
+import sys
+
+from main import SessionLocal, EXPORT_MODELS, IMPORT_BATCH_SIZE, import_books, read_catalogue, export_rows, response_cache
+
+def import_file(path, file_format, batch_size):
+    file_format = file_format or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    db = SessionLocal()
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as lines:
+            report = import_books(db, read_catalogue(lines, file_format), batch_size=batch_size)
+    finally:
+        db.close()
+    if report["imported"]:
+        response_cache.bump("books")  # running servers drop their cached catalogue pages
+
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['error']} ({error['serial_number']})", file=sys.stderr)
+    print(f"Imported {report['imported']} items, {len(report['errors'])} rows rejected")
+    return 1 if report["errors"] else 0
+
+def export_table(table, file_format):
+    for chunk in export_rows(EXPORT_MODELS[table], file_format):
+        sys.stdout.write(chunk)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk catalogue import/export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import books/movies from CSV or JSON Lines")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    export_parser = commands.add_parser("export", help="stream a table to stdout")
+    export_parser.add_argument("table", choices=sorted(EXPORT_MODELS))
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        return import_file(args.path, args.format, args.batch_size)
+    return export_table(args.table, args.format)
+
+if __name__ == "__main__":
+    sys.exit(main())
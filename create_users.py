@@ -5,12 +5,14 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, String, Boolean
+from passlib.context import CryptContext
 
 # Setup SQLite database
 DATABASE_URL = "sqlite:///./library.db"
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # User model
 class User(Base):
@@ -35,7 +37,7 @@ def create_default_users():
         # Create admin user
         admin = User(
             username="admin",
-            password="admin",
+            password=pwd_context.hash("admin"),
             full_name="Administrator",
             is_admin=True
         )
@@ -44,7 +46,7 @@ def create_default_users():
         # Create regular user
         user = User(
             username="user",
-            password="user",
+            password=pwd_context.hash("user"),
             full_name="Regular User",
             is_admin=False
         )
@@ -1,29 +1,151 @@
 # app.py
-from fastapi import FastAPI, Depends, HTTPException, Form, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Form, Request, UploadFile, File, Query, status
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse, Response, ORJSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, ForeignKey, Float
+from sqlalchemy import create_engine, Column, Integer, BigInteger, SmallInteger, String, Boolean, Date, DateTime, ForeignKey, Float, Index, tuple_, text, event, inspect, select, insert, update, delete, func, case, or_, and_, exists, literal, bindparam, union_all
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
-from datetime import datetime, timedelta
-from typing import Optional
+from sqlalchemy.orm import sessionmaker, Session, relationship, aliased
+from datetime import datetime, date, timedelta
+from typing import Optional, NamedTuple, List, Generic, TypeVar, Literal
 import os
 import sqlite3
+import json
+import csv
+import io
+import gzip
+import base64
+import re
+import itertools
+import hmac
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict, Counter
 import secrets
-from pydantic import BaseModel
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from functools import lru_cache
+from urllib.parse import urlencode
+from pydantic import BaseModel, ConfigDict, Field
+from passlib.context import CryptContext
+from jose import jwt, JWTError
+import jinja2
 import uvicorn
 
+try:
+    import redis
+except ImportError:  # only needed when RESPONSE_CACHE_URL points at a Redis server
+    redis = None
+
+try:
+    import brotli
+except ImportError:  # the JSON API falls back to gzip
+    brotli = None
+
 # Setup FastAPI app
-app = FastAPI(title="Library Management System")
-security = HTTPBasic()
-templates = Jinja2Templates(directory="templates")
+@asynccontextmanager
+async def lifespan(app):
+    warm_templates()
+    sweeper = asyncio.create_task(run_overdue_sweeper()) if OVERDUE_SWEEP_INTERVAL > 0 else None
+    app_ready.set()
+    yield
+    app_ready.clear()  # /readyz fails while requests in flight drain
+    if sweeper:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+
+app = FastAPI(title="Library Management System", lifespan=lifespan)
+security = HTTPBasic(auto_error=False)  # session cookie first, Basic as fallback
+
+# Templates are compiled ahead of the first request: lifespan runs warm_templates(), and
+# Jinja's bytecode cache (TEMPLATE_CACHE_DIR, a per-user temp directory by default) lets
+# later starts and workers skip parsing. TEMPLATE_AUTO_RELOAD=1 re-reads edited templates
+# and turns off the static page cache, for template work.
+TEMPLATE_DIR = "templates"
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")
+TEMPLATE_AUTO_RELOAD = os.environ.get("TEMPLATE_AUTO_RELOAD", "0") == "1"
+if TEMPLATE_CACHE_DIR:
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+
+templates = Jinja2Templates(env=jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=jinja2.FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+))
+
+def warm_templates():
+    """Compile every template into the environment's cache; returns how many compiled.
+
+    A template with a syntax error is reported and left to fail on its own route
+    rather than keeping the whole app from starting.
+    """
+    compiled = 0
+    for name in templates.env.list_templates(extensions=["html"]):
+        try:
+            templates.env.get_template(name)
+            compiled += 1
+        except jinja2.TemplateSyntaxError as e:
+            print(f"Template {name} failed to compile: {e}")
+    return compiled
+
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Setup SQLite database
-DATABASE_URL = "sqlite:///./library.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# DATABASE_URL may point at any SQLAlchemy URL (e.g. postgresql://...); DB_PROFILE picks the
+# engine tuning below, and DB_POOL_SIZE / DB_MAX_OVERFLOW override the profile's pool size.
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./library.db")
+DB_PROFILE = os.environ.get("DB_PROFILE", "default")
+
+ENGINE_PROFILES = {
+    # SQLite defaults: rollback journal, writers block readers
+    "default": {"pragmas": {}, "pool_size": 5, "max_overflow": 10},
+    # WAL lets report readers run alongside issue/return writers
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -64000,  # KiB, i.e. 64 MB per connection
+            "mmap_size": 268435456,
+            "busy_timeout": 5000,  # ms
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 10,
+        "max_overflow": 20,
+    },
+}
+
+def build_engine(url=DATABASE_URL, profile=DB_PROFILE):
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+    kwargs = {}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if ":memory:" not in url and url != "sqlite://":
+        kwargs["pool_size"] = int(os.environ.get("DB_POOL_SIZE", settings["pool_size"]))
+        kwargs["max_overflow"] = int(os.environ.get("DB_MAX_OVERFLOW", settings["max_overflow"]))
+    new_engine = create_engine(url, **kwargs)
+
+    pragmas = settings["pragmas"]
+    if pragmas and new_engine.dialect.name == "sqlite":
+        @event.listens_for(new_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return new_engine
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -47,7 +169,55 @@ class Membership(Base):
     start_date = Column(Date)
     end_date = Column(Date)
     membership_type = Column(String)  # 6 months, 1 year, 2 years
+
+    __table_args__ = (
+        Index("ix_memberships_first_name", "first_name"),
+        Index("ix_memberships_end_date", "end_date"),
+        # Case-insensitive indexes let ``LIKE 'prefix%'`` member lookups seek instead of scan.
+        Index("ix_memberships_first_name_nocase", first_name.collate("NOCASE")),
+        Index("ix_memberships_last_name_nocase", last_name.collate("NOCASE")),
+        Index("ix_memberships_aadhar_card_nocase", aadhar_card.collate("NOCASE")),
+    )
     
+class CopyStatus(TypeDecorator):
+    """A copy's circulation status, stored as a small integer code but used as its name in Python."""
+
+    impl = SmallInteger
+    cache_ok = True
+    CODES = {"Available": 0, "Issued": 1, "On hold": 2}
+    NAMES = {code: name for name, code in CODES.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return self.CODES[value]
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.NAMES[int(value)]
+
+class Work(Base):
+    """A title: every physical copy (Book row) of the same title/author/type points at one Work.
+
+    ``copies`` and ``available_count`` are kept current by the circulation
+    helpers (issue_copy, issue_copies, release_copies) and by attach_copies /
+    detach_copy when copies are added or re-catalogued, so availability per
+    title is a single row read.
+    """
+    __tablename__ = "works"
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String)
+    author = Column(String)
+    is_movie = Column(Boolean, default=False)
+    genre = Column(String)
+    copies = Column(Integer, default=0, nullable=False)
+    available_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ux_works_title_author", "title", "author", "is_movie", unique=True),
+        Index("ix_works_is_movie_title", "is_movie", "title"),
+        Index("ix_works_is_movie_author", "is_movie", "author"),
+    )
+
 class Book(Base):
     __tablename__ = "books"
     id = Column(Integer, primary_key=True, index=True)
@@ -56,7 +226,23 @@ class Book(Base):
     is_movie = Column(Boolean, default=False)
     genre = Column(String)
     serial_number = Column(String, unique=True)
-    status = Column(String, default="Available")  # Available, Issued
+    status = Column(CopyStatus, default="Available", nullable=False, server_default=text("0"))
+    work_id = Column(Integer, ForeignKey("works.id"))
+
+    work = relationship("Work")
+
+    # SQLite appends the rowid (id) to every index, so these also serve as
+    # (..., id) keyset pagination indexes for the listing reports.
+    __table_args__ = (
+        Index("ix_books_title", "title"),
+        Index("ix_books_is_movie", "is_movie"),
+        Index("ix_books_is_movie_title", "is_movie", "title"),
+        Index("ix_books_is_movie_author", "is_movie", "author"),
+        Index("ix_books_author", "author"),
+        Index("ix_books_is_movie_status", "is_movie", "status"),
+        # Finds a free copy of a title, and copies not yet attached to a work (work_id IS NULL)
+        Index("ix_books_work_id_status", "work_id", "status"),
+    )
     
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -69,14 +255,622 @@ class Transaction(Base):
     fine_amount = Column(Float, default=0.0)
     fine_paid = Column(Boolean, default=False)
     remarks = Column(String, nullable=True)
+    # Maintained for open loans by sweep_overdue(), not at return time
+    accrued_fine = Column(Float, default=0.0, server_default=text("0"))
+    is_overdue = Column(Boolean, default=False, server_default=text("0"))
     
     book = relationship("Book")
     member = relationship("Membership")
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        # A member's or a copy's loans in date order (history), and the per-copy
+        # loan counts behind the analytics, read from the index alone
+        Index("ix_transactions_member_id_issue_date", "member_id", "issue_date"),
+        Index("ix_transactions_book_id_issue_date", "book_id", "issue_date"),
+        # Open loans only: serves active issues, overdue (return_date < today) and return-book
+        Index(
+            "ix_transactions_open_return_date", "return_date",
+            sqlite_where=text("actual_return_date IS NULL"),
+            postgresql_where=text("actual_return_date IS NULL"),
+        ),
+        Index(
+            "ix_transactions_open_overdue", "is_overdue", "return_date",
+            sqlite_where=text("actual_return_date IS NULL"),
+            postgresql_where=text("actual_return_date IS NULL"),
+        ),
+    )
+
+# Closed loans whose fines are settled, moved out of transactions by archive_transactions()
+# once they are ARCHIVE_AFTER_DAYS old. Rows keep their transaction id.
+class TransactionArchive(Base):
+    __tablename__ = "transactions_archive"
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"))
+    member_id = Column(Integer, ForeignKey("memberships.id"))
+    issue_date = Column(Date)
+    return_date = Column(Date)
+    actual_return_date = Column(Date)
+    fine_amount = Column(Float, default=0.0)
+    fine_paid = Column(Boolean, default=False)
+    remarks = Column(String, nullable=True)
+    accrued_fine = Column(Float, default=0.0)
+    is_overdue = Column(Boolean, default=False)
+    archived_on = Column(Date)
+
+    __table_args__ = (
+        Index("ix_transactions_archive_member_id_issue_date", "member_id", "issue_date"),
+        Index("ix_transactions_archive_book_id_issue_date", "book_id", "issue_date"),
+    )
+
+# A member waiting for a title. The Waiting holds on a Work are served in (created_at, id)
+# order: when any copy of it comes back, release_copies sets that copy aside (status
+# "On hold") for the first of them, which becomes Ready, in the same transaction.
+class Hold(Base):
+    __tablename__ = "holds"
+    id = Column(Integer, primary_key=True, index=True)
+    work_id = Column(Integer, ForeignKey("works.id"))
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)  # the copy asked for; once Ready, the copy set aside
+    member_id = Column(Integer, ForeignKey("memberships.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    status = Column(String, default="Waiting", nullable=False)  # Waiting, Ready, Fulfilled, Cancelled, Expired
+    ready_on = Column(Date, nullable=True)
+
+    book = relationship("Book")
+    member = relationship("Membership")
+
+    __table_args__ = (
+        # One title's queue in arrival order
+        Index("ix_holds_work_id_created_at", "work_id", "created_at"),
+        # The Ready hold collect_hold looks up by copy
+        Index("ix_holds_book_id_status", "book_id", "status"),
+        # Open holds for the pending list, the event stream and expiry
+        Index("ix_holds_status_created_at", "status", "created_at"),
+    )
+
+# Dashboard counters, kept current by the endpoints that change them (see bump_counters)
+class ReportCounter(Base):
+    __tablename__ = "report_counters"
+    name = Column(String, primary_key=True)  # books, movies, members, fines_outstanding, fines_collected
+    value = Column(Float, default=0.0)
+
+class OpenLoansByDueDate(Base):
+    # Open loans grouped by due date: overdue = SUM(open_loans) WHERE return_date < today
+    __tablename__ = "open_loans_by_due_date"
+    return_date = Column(Date, primary_key=True)
+    open_loans = Column(Integer, default=0)
+
+# Monthly rollups for the analytics report; month is the first day of the month.
+# Kept current by the circulation functions (see bump_rollup), rebuilt by rebuild_rollups.
+class MonthlyLoans(Base):
+    __tablename__ = "monthly_loans"
+    month = Column(Date, primary_key=True)  # of issue_date
+    work_id = Column(Integer, ForeignKey("works.id"), primary_key=True)
+    loans = Column(Integer, default=0)
+
+class MonthlyFines(Base):
+    __tablename__ = "monthly_fines"
+    month = Column(Date, primary_key=True)  # of actual_return_date, when the fine is assessed
+    assessed = Column(Float, default=0.0)
+    collected = Column(Float, default=0.0)  # the part of ``assessed`` paid so far
+
+# Cross-worker invalidation channel (see SharedVersions)
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)  # a cached table's name, or "user:<username>"
+    version = Column(BigInteger, default=0)  # a counter; for users, when their sessions were revoked
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_at = Column(DateTime)
+
+# Full-text search
+SEARCH_LIMIT = 100
+
+def create_search_index(conn):
+    """Create the books_fts FTS5 index over the catalogue and the triggers keeping it in sync.
+
+    The index uses books as its external content table, so only the token
+    index is stored; INSERT/UPDATE/DELETE triggers on books keep it current
+    for add_book, update_book and any other writer.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    index_present = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'").first()
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+        "title, author, genre, serial_number, content='books', content_rowid='id', prefix='2 3')"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+        "INSERT INTO books_fts(rowid, title, author, genre, serial_number) "
+        "VALUES (new.id, new.title, new.author, new.genre, new.serial_number); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, genre, serial_number) "
+        "VALUES ('delete', old.id, old.title, old.author, old.genre, old.serial_number); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, genre, serial_number ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, genre, serial_number) "
+        "VALUES ('delete', old.id, old.title, old.author, old.genre, old.serial_number); "
+        "INSERT INTO books_fts(rowid, title, author, genre, serial_number) "
+        "VALUES (new.id, new.title, new.author, new.genre, new.serial_number); END"
+    )
+    if not index_present:
+        conn.exec_driver_sql("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+def fts_prefix_query(column, value):
+    """Turn free text into an FTS5 expression matching every word as a prefix within ``column``."""
+    words = re.findall(r"\w+", value or "")
+    return " AND ".join(f'{column} : "{word}"*' for word in words)
+
+def search_books(db: Session, title: Optional[str] = None, author: Optional[str] = None, limit: int = SEARCH_LIMIT):
+    """Books whose title/author words start with the given terms, best matches first."""
+    if db.get_bind().dialect.name != "sqlite":
+        query = db.query(Book)
+        if title:
+            query = query.filter(Book.title.ilike(f"%{title}%"))
+        if author:
+            query = query.filter(Book.author.ilike(f"%{author}%"))
+        return query.limit(limit).all()
+
+    expression = " AND ".join(
+        part for part in (fts_prefix_query("title", title), fts_prefix_query("author", author)) if part
+    )
+    if not expression:
+        return []
+    statement = text(
+        "SELECT books.* FROM books_fts JOIN books ON books.id = books_fts.rowid "
+        "WHERE books_fts MATCH :expression ORDER BY books_fts.rank LIMIT :limit"
+    )
+    return db.query(Book).from_statement(statement).params(expression=expression, limit=limit).all()
+
+def search_works(db: Session, title: Optional[str] = None, author: Optional[str] = None, limit: int = SEARCH_LIMIT):
+    """Titles (Works) with a copy matching search_books' terms, best matches first, with their copy counters."""
+    if db.get_bind().dialect.name != "sqlite":
+        query = db.query(Work).filter(Work.copies > 0)
+        if title:
+            query = query.filter(Work.title.ilike(f"%{title}%"))
+        if author:
+            query = query.filter(Work.author.ilike(f"%{author}%"))
+        return query.limit(limit).all()
+
+    expression = " AND ".join(
+        part for part in (fts_prefix_query("title", title), fts_prefix_query("author", author)) if part
+    )
+    if not expression:
+        return []
+    statement = text(
+        "SELECT works.* FROM works JOIN ("
+        "SELECT books.work_id AS work_id, MIN(books_fts.rank) AS best FROM books_fts "
+        "JOIN books ON books.id = books_fts.rowid WHERE books_fts MATCH :expression GROUP BY books.work_id"
+        ") matches ON matches.work_id = works.id ORDER BY matches.best LIMIT :limit"
+    )
+    return db.query(Work).from_statement(statement).params(expression=expression, limit=limit).all()
+
+# Member lookup
+MEMBER_SEARCH_LIMIT = 20
+MEMBER_SEARCH_CACHE_SIZE = 512
+
+def like_prefix(value):
+    """Escape LIKE wildcards in ``value`` and turn it into a prefix pattern."""
+    return re.sub(r"([\\%_])", r"\\\1", value) + "%"
+
+def member_prefix_filter(q):
+    """Filter for memberships whose first name, last name or Aadhar number starts with ``q``.
+
+    Two or more words are matched as first name + last name prefixes.
+    Returns None when ``q`` is blank.
+    """
+    words = (q or "").split()
+    if not words:
+        return None
+    if len(words) > 1:
+        return and_(
+            Membership.first_name.collate("NOCASE").like(like_prefix(words[0]), escape="\\"),
+            Membership.last_name.collate("NOCASE").like(like_prefix(" ".join(words[1:])), escape="\\"),
+        )
+    pattern = like_prefix(words[0])
+    return or_(
+        Membership.first_name.collate("NOCASE").like(pattern, escape="\\"),
+        Membership.last_name.collate("NOCASE").like(pattern, escape="\\"),
+        Membership.aadhar_card.collate("NOCASE").like(pattern, escape="\\"),
+    )
+
+def search_members(db: Session, q, today=None, limit=MEMBER_SEARCH_LIMIT):
+    """Active memberships matching member_prefix_filter(q); those that ended before ``today`` are left out."""
+    today = today or date.today()
+    condition = member_prefix_filter(q)
+    if condition is None:
+        return []
+    rows = (
+        db.query(Membership.id, Membership.first_name, Membership.last_name, Membership.aadhar_card, Membership.end_date)
+        .filter(condition, Membership.end_date >= today)
+        .order_by(Membership.first_name, Membership.last_name, Membership.id)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "id": row.id,
+            "name": f"{row.first_name} {row.last_name}",
+            "aadhar_card": row.aadhar_card,
+            "end_date": row.end_date.isoformat() if row.end_date else None,
+        }
+        for row in rows
+    ]
+
+@lru_cache(maxsize=MEMBER_SEARCH_CACHE_SIZE)
+def cached_member_search(q, today, limit=MEMBER_SEARCH_LIMIT):
+    """search_members memoised per (query, day); cleared whenever a membership changes.
+
+    ``today`` is part of the key, so memberships drop out of cached results
+    the day after their end_date without an explicit invalidation.
+    """
+    db = SessionLocal()
+    try:
+        return tuple(search_members(db, q, today=today, limit=limit))
+    finally:
+        db.close()
+
+# Transaction archive
+# Loans that are returned, fine-settled and older than ARCHIVE_AFTER_DAYS move to
+# transactions_archive (run archive.py from cron), so transactions only holds recent
+# and open loans. History reports read both through loan_history(); the dashboard
+# counters and analytics rollups already include archived loans.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = 5000
+
+def archivable(cutoff):
+    """Loans returned before ``cutoff`` with no unpaid fine."""
+    return and_(
+        Transaction.actual_return_date != None,
+        Transaction.actual_return_date < cutoff,
+        or_(Transaction.fine_amount == 0, Transaction.fine_amount == None, Transaction.fine_paid == True),
+    )
+
+def archive_transactions(db: Session, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, today=None):
+    """Move archivable loans to transactions_archive in batches, one commit per batch; returns how many.
+
+    The newest transaction is never archived: SQLite assigns max(id) + 1 to new
+    rows, so keeping it in place stops archived ids from being handed out again.
+    """
+    today = today or datetime.now().date()
+    cutoff = today - timedelta(days=older_than_days)
+    columns = [column.name for column in Transaction.__table__.columns]
+    newest = select(func.max(Transaction.id)).scalar_subquery()
+    moved = 0
+    while True:
+        ids = db.execute(
+            select(Transaction.id).where(archivable(cutoff), Transaction.id < newest).order_by(Transaction.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+        db.execute(insert(TransactionArchive).from_select(
+            columns + ["archived_on"],
+            select(*[Transaction.__table__.c[name] for name in columns], literal(today, Date)).where(Transaction.id.in_(ids)),
+        ))
+        db.execute(delete(Transaction).where(Transaction.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+
+def loan_history(*names):
+    """Hot and archived loans as one subquery (UNION ALL) with the named columns.
+
+    Filters on the subquery's columns are pushed into both halves, so each
+    table is read through its own indexes.
+    """
+    return union_all(
+        select(*[getattr(Transaction, name) for name in names]),
+        select(*[getattr(TransactionArchive, name) for name in names]),
+    ).subquery("loan_history")
+
+# Report counters
+REPORT_COUNTERS = ("books", "movies", "members", "fines_outstanding", "fines_collected")
+
+def rebuild_report_counters(conn):
+    """Recompute every dashboard counter from the base tables."""
+    conn.execute(ReportCounter.__table__.delete())
+    conn.execute(OpenLoansByDueDate.__table__.delete())
+    books, movies = conn.execute(select(
+        func.count(case((Book.is_movie == False, 1))),
+        func.count(case((Book.is_movie == True, 1))),
+    )).one()
+    members = conn.execute(select(func.count(Membership.id))).scalar()
+    outstanding, collected = conn.execute(select(
+        func.coalesce(func.sum(case((Transaction.fine_paid == False, Transaction.fine_amount))), 0),
+        func.coalesce(func.sum(case((Transaction.fine_paid == True, Transaction.fine_amount))), 0),
+    ).where(Transaction.fine_amount > 0)).one()
+    collected += conn.execute(select(func.coalesce(func.sum(TransactionArchive.fine_amount), 0)).where(
+        TransactionArchive.fine_amount > 0, TransactionArchive.fine_paid == True
+    )).scalar()
+    values = {"books": books, "movies": movies, "members": members,
+              "fines_outstanding": outstanding, "fines_collected": collected}
+    conn.execute(insert(ReportCounter), [{"name": name, "value": values[name]} for name in REPORT_COUNTERS])
+    conn.execute(insert(OpenLoansByDueDate).from_select(
+        ["return_date", "open_loans"],
+        select(Transaction.return_date, func.count()).where(Transaction.actual_return_date == None).group_by(Transaction.return_date),
+    ))
+
+def bump_counters(db: Session, **deltas):
+    """Adjust dashboard counters inside the caller's transaction, e.g. ``bump_counters(db, books=1)``."""
+    for name, delta in deltas.items():
+        if delta:
+            db.execute(update(ReportCounter).where(ReportCounter.name == name).values(value=ReportCounter.value + delta))
+
+def upsert(dialect_name, model):
+    """An INSERT for ``model`` that supports ``on_conflict_do_update`` on this dialect."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+def bump_rollup(db: Session, model, key, **deltas):
+    """Add ``deltas`` to the ``model`` row whose primary key is ``key``, creating it if missing."""
+    statement = upsert(db.get_bind().dialect.name, model).values(**key, **deltas)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[getattr(model, name) for name in key],
+        set_={name: getattr(model, name) + delta for name, delta in deltas.items()},
+    ))
+
+def bump_open_loans(db: Session, return_date, delta):
+    bump_rollup(db, OpenLoansByDueDate, {"return_date": return_date}, open_loans=delta)
+
+def record_loans(db: Session, issue_date, work_counts):
+    """Count new loans per work in the monthly rollup; ``work_counts`` maps work_id to loans."""
+    for work_id, count in work_counts.items():
+        if work_id is not None and count:
+            bump_rollup(db, MonthlyLoans, {"month": issue_date.replace(day=1), "work_id": work_id}, loans=count)
+
+def record_fines(db: Session, actual_return_date, assessed=0.0, collected=0.0):
+    """Add to the fines assessed and/or collected for the month a loan was returned."""
+    deltas = {name: value for name, value in (("assessed", assessed), ("collected", collected)) if value}
+    if deltas:
+        bump_rollup(db, MonthlyFines, {"month": actual_return_date.replace(day=1)}, **deltas)
+
+def month_of(column, dialect_name):
+    """SQL for the first day of ``column``'s month."""
+    if dialect_name == "postgresql":
+        return func.cast(func.date_trunc("month", column), Date)
+    return func.date(column, "start of month")
+
+def days_late(today, dialect_name):
+    """SQL for the whole days a loan's return_date is behind ``today`` (negative while not yet due)."""
+    today = literal(today, Date)
+    if dialect_name == "postgresql":
+        return today - Transaction.return_date
+    return func.cast(func.julianday(today) - func.julianday(Transaction.return_date), Integer)
+
+def rebuild_rollups(conn):
+    """Recompute the monthly loan and fine rollups from the transactions table."""
+    conn.execute(MonthlyLoans.__table__.delete())
+    conn.execute(MonthlyFines.__table__.delete())
+    loans = loan_history("book_id", "issue_date")
+    issued = month_of(loans.c.issue_date, conn.dialect.name)
+    conn.execute(insert(MonthlyLoans).from_select(
+        ["month", "work_id", "loans"],
+        select(issued, Book.work_id, func.count())
+        .join(Book, Book.id == loans.c.book_id)
+        .where(Book.work_id != None)
+        .group_by(issued, Book.work_id),
+    ))
+    fines = loan_history("actual_return_date", "fine_amount", "fine_paid")
+    returned = month_of(fines.c.actual_return_date, conn.dialect.name)
+    conn.execute(insert(MonthlyFines).from_select(
+        ["month", "assessed", "collected"],
+        select(returned, func.sum(fines.c.fine_amount), func.sum(case((fines.c.fine_paid == True, fines.c.fine_amount), else_=0)))
+        .where(fines.c.fine_amount > 0, fines.c.actual_return_date != None)
+        .group_by(returned),
+    ))
+
+def library_summary(db: Session):
+    today = datetime.now().date()
+    counters = dict(db.query(ReportCounter.name, ReportCounter.value).all())
+    open_loans, overdue = db.query(
+        func.coalesce(func.sum(OpenLoansByDueDate.open_loans), 0),
+        func.coalesce(func.sum(case((OpenLoansByDueDate.return_date < today, OpenLoansByDueDate.open_loans), else_=0)), 0),
+    ).one()
+    # Fine to date on the same loans ``overdue`` counts, from return_date rather than the sweep
+    fines_accruing = db.query(func.coalesce(func.sum(days_late(today, db.get_bind().dialect.name) * FINE_PER_DAY), 0.0)).filter(
+        Transaction.actual_return_date == None, Transaction.return_date < today
+    ).scalar()
+    return {
+        "books": int(counters.get("books", 0)),
+        "movies": int(counters.get("movies", 0)),
+        "members": int(counters.get("members", 0)),
+        "issued": int(open_loans),
+        "overdue": int(overdue),
+        "fines_outstanding": counters.get("fines_outstanding", 0.0),
+        "fines_collected": counters.get("fines_collected", 0.0),
+        "fines_accruing": fines_accruing,
+    }
+
+# Works (titles) and their copies
+def same_work():
+    """Join condition between Work and Book; titles/authors may be NULL in old rows."""
+    return and_(
+        Work.title.is_not_distinct_from(Book.title),
+        Work.author.is_not_distinct_from(Book.author),
+        Work.is_movie == Book.is_movie,
+    )
+
+def attach_copies(db):
+    """Attach every copy with no work_id to its title's Work, creating missing Works,
+    and add those copies to the Works' counters. Set-based, so it serves add_book,
+    the catalogue import and the initial migration alike; the caller commits.
+    """
+    conn = db.connection() if isinstance(db, Session) else db
+    conn.execute(insert(Work).from_select(
+        ["title", "author", "is_movie", "genre", "copies", "available_count"],
+        select(Book.title, Book.author, Book.is_movie, func.min(Book.genre), literal(0), literal(0))
+        .where(Book.work_id == None, ~exists().where(same_work()))
+        .group_by(Book.title, Book.author, Book.is_movie),
+    ))
+    counts = conn.execute(
+        select(Work.id, func.count(), func.count(case((Book.status == "Available", 1))))
+        .join(Book, same_work())
+        .where(Book.work_id == None)
+        .group_by(Work.id)
+    ).all()
+    if counts:
+        conn.execute(
+            update(Work).where(Work.id == bindparam("work")).values(
+                copies=Work.copies + bindparam("added"),
+                available_count=Work.available_count + bindparam("available"),
+            ),
+            [{"work": work, "added": added, "available": available} for work, added, available in counts],
+        )
+        conn.execute(
+            update(Book).where(Book.work_id == None)
+            .values(work_id=select(Work.id).where(same_work()).scalar_subquery())
+        )
+
+def detach_copy(db: Session, book):
+    """Take a copy out of its Work's counters before its title/author/type changes; re-attach with attach_copies."""
+    if book.work_id is not None:
+        db.execute(
+            update(Work).where(Work.id == book.work_id).values(
+                copies=Work.copies - 1,
+                available_count=Work.available_count - (1 if book.status == "Available" else 0),
+            ).execution_options(synchronize_session=False)
+        )
+    book.work_id = None
+
+def available_copy(db: Session, work_id):
+    """Any copy of a work that is on the shelf, read from ix_books_work_id_status."""
+    return db.query(Book).filter(Book.work_id == work_id, Book.status == "Available").first()
+
+def adjust_available(db: Session, deltas):
+    """Apply ``{work_id: change}`` to available_count with one executemany UPDATE."""
+    rows = [{"work": work_id, "delta": delta} for work_id, delta in deltas.items() if work_id is not None and delta]
+    if rows:
+        db.connection().execute(
+            update(Work).where(Work.id == bindparam("work")).values(available_count=Work.available_count + bindparam("delta")),
+            rows,
+        )
+
+# Schema migrations
+# create_all only creates missing tables, so anything added to an existing table
+# (indexes, columns, virtual tables, triggers) is applied here, once, in order.
+def create_indexes(*names):
+    def migrate(conn):
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in names:
+                    index.create(bind=conn, checkfirst=True)
+    return migrate
+
+def add_columns(table_name, *column_names):
+    def migrate(conn):
+        existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column = Base.metadata.tables[table_name].c[name]
+            ddl = f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg.text}"
+            conn.exec_driver_sql(ddl)
+    return migrate
+
+def convert_book_status(conn):
+    """Store books.status as CopyStatus codes instead of the 'Available'/'Issued' strings."""
+    column = next(column for column in inspect(conn).get_columns("books") if column["name"] == "status")
+    if isinstance(column["type"], Integer):
+        return
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            "ALTER TABLE books ALTER COLUMN status TYPE SMALLINT "
+            "USING CASE WHEN status = 'Issued' THEN 1 ELSE 0 END"
+        )
+        return
+    conn.exec_driver_sql("ALTER TABLE books ADD COLUMN status_code SMALLINT NOT NULL DEFAULT 0")
+    conn.exec_driver_sql("UPDATE books SET status_code = CASE WHEN status = 'Issued' THEN 1 ELSE 0 END")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_books_is_movie_status")
+    conn.exec_driver_sql("ALTER TABLE books DROP COLUMN status")
+    conn.exec_driver_sql("ALTER TABLE books RENAME COLUMN status_code TO status")
+
+def attach_holds(conn):
+    """Queue holds placed on a copy under that copy's title."""
+    conn.execute(update(Hold).where(Hold.work_id == None).values(
+        work_id=select(Book.work_id).where(Book.id == Hold.book_id).scalar_subquery()
+    ))
+
+def drop_indexes(*names):
+    def migrate(conn):
+        for name in names:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    return migrate
+
+def run_steps(*steps):
+    def migrate(conn):
+        for step in steps:
+            step(conn)
+    return migrate
+
+MIGRATIONS = [
+    (1, "Keyset pagination indexes", create_indexes(
+        "ix_books_title", "ix_books_is_movie_title", "ix_books_is_movie_author",
+        "ix_memberships_first_name", "ix_memberships_end_date",
+    )),
+    (2, "Full-text search over books", create_search_index),
+    (3, "Report filter indexes", create_indexes(
+        "ix_books_is_movie", "ix_books_author", "ix_books_is_movie_status",
+        "ix_transactions_book_id", "ix_transactions_member_id", "ix_transactions_open_return_date",
+    )),
+    (4, "Dashboard summary counters", rebuild_report_counters),
+    (5, "Precomputed overdue state and accrued fines", run_steps(
+        add_columns("transactions", "accrued_fine", "is_overdue"),
+        create_indexes("ix_transactions_open_overdue"),
+    )),
+    (6, "Member lookup indexes", create_indexes(
+        "ix_memberships_first_name_nocase", "ix_memberships_last_name_nocase", "ix_memberships_aadhar_card_nocase",
+    )),
+    (7, "Works with per-title copy counters; integer copy status", run_steps(
+        convert_book_status,
+        add_columns("books", "work_id"),
+        create_indexes("ix_books_is_movie_status", "ix_books_work_id_status"),
+        attach_copies,
+    )),
+    (8, "History indexes and monthly analytics rollups", run_steps(
+        create_indexes("ix_transactions_member_id_issue_date", "ix_transactions_book_id_issue_date"),
+        drop_indexes("ix_transactions_member_id", "ix_transactions_book_id"),  # prefixes of the above
+        rebuild_rollups,
+    )),
+    (9, "Holds queue per title", run_steps(
+        add_columns("holds", "work_id"),
+        attach_holds,
+        create_indexes("ix_holds_work_id_created_at", "ix_holds_book_id_status"),
+        drop_indexes("ix_holds_book_id_created_at"),
+    )),
+]
+
+def run_migrations(bind):
+    """Create missing tables, then apply every migration not yet recorded in schema_migrations."""
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        applied = set(conn.execute(select(SchemaMigration.version)).scalars())
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(conn)
+            conn.execute(insert(SchemaMigration).values(
+                version=version, description=description, applied_at=datetime.now()
+            ))
+
+# Processes started by serve.py get RUN_MIGRATIONS=0: the launcher has already migrated,
+# and workers importing this module at the same time would race on the DDL.
+RUN_MIGRATIONS = os.environ.get("RUN_MIGRATIONS", "1") == "1"
+if RUN_MIGRATIONS:
+    run_migrations(engine)
 
 # Dependency
+# Handlers that use the synchronous Session are plain ``def`` so FastAPI runs them in
+# its threadpool; declaring them ``async def`` would block the event loop on every query.
 def get_db():
     db = SessionLocal()
     try:
@@ -84,90 +878,1534 @@ def get_db():
     finally:
         db.close()
 
+# Request metrics
+# Opt-in with METRICS_ENABLED=1: per-route latency histograms, SQL statement count,
+# DB time and template render time, served in Prometheus text format at /metrics.
+# Requests slower than SLOW_REQUEST_MS are printed with their slowest statements.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_QUERIES = 10  # statements kept (slowest first) for the slow-request log
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+class RequestStats:
+    """What one request spent on SQL and templates; filled in by the engine and template hooks."""
+
+    __slots__ = ("queries", "db_seconds", "render_seconds", "slowest")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.slowest = []  # min-heap of (seconds, statement)
+
+    def record_query(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.slowest) < SLOW_REQUEST_QUERIES:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+current_request_stats = ContextVar("current_request_stats", default=None)
+
+class RouteMetrics:
+    """Per (method, route) latency histogram and SQL/template totals, plus per-status request counts."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._routes = {}
+        self._responses = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status_code, seconds, stats):
+        with self._lock:
+            entry = self._routes.get((method, route))
+            if entry is None:
+                entry = self._routes[(method, route)] = {
+                    "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0,
+                    "queries": 0, "db_seconds": 0.0, "render_seconds": 0.0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["queries"] += stats.queries
+            entry["db_seconds"] += stats.db_seconds
+            entry["render_seconds"] += stats.render_seconds
+            self._responses[(method, route, status_code)] += 1
+
+    def render(self):
+        with self._lock:
+            routes = {key: dict(entry, buckets=list(entry["buckets"])) for key, entry in self._routes.items()}
+            responses = dict(self._responses)
+
+        def labels(method, route, **extra):
+            pairs = {"method": method, "route": route, **extra}
+            return ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs.items())
+
+        lines = [
+            "# HELP library_request_duration_seconds Time from request start to the last response byte.",
+            "# TYPE library_request_duration_seconds histogram",
+        ]
+        for (method, route), entry in sorted(routes.items()):
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f"library_request_duration_seconds_bucket{{{labels(method, route, le=bound)}}} {count}")
+            lines.append(f'library_request_duration_seconds_bucket{{{labels(method, route, le="+Inf")}}} {entry["count"]}')
+            lines.append(f"library_request_duration_seconds_sum{{{labels(method, route)}}} {entry['sum']}")
+            lines.append(f"library_request_duration_seconds_count{{{labels(method, route)}}} {entry['count']}")
+        for name, key, help_text in (
+            ("library_db_queries_total", "queries", "SQL statements executed while serving requests."),
+            ("library_db_seconds_total", "db_seconds", "Time spent in SQL statements while serving requests."),
+            ("library_template_render_seconds_total", "render_seconds", "Time spent rendering templates while serving requests."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), entry in sorted(routes.items()):
+                lines.append(f"{name}{{{labels(method, route)}}} {entry[key]}")
+        lines.append("# HELP library_responses_total Responses sent, by status code.")
+        lines.append("# TYPE library_responses_total counter")
+        for (method, route, status_code), count in sorted(responses.items()):
+            lines.append(f"library_responses_total{{{labels(method, route, status=status_code)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+route_metrics = RouteMetrics()
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record_query(statement, time.perf_counter() - started.pop())
+
+class TimedTemplate(jinja2.Template):
+    """Template that adds its render time to the current request's stats.
+
+    Streamed reports fetch rows while the template iterates, so their render
+    time includes those fetches (which are also counted as DB time).
+    """
+
+    def render(self, *args, **kwargs):
+        stats = current_request_stats.get()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.render_seconds += time.perf_counter() - started
+
+    def generate(self, *args, **kwargs):
+        stats = current_request_stats.get()
+        chunks = super().generate(*args, **kwargs)
+        if stats is None:
+            yield from chunks
+            return
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            stats.render_seconds += time.perf_counter() - started
+            if chunk is None:
+                return
+            yield chunk
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request through to its last body chunk, so streamed reports count in full."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            route_metrics.observe(scope["method"], route_path, status_code, elapsed, stats)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                print(
+                    f"Slow request: {scope['method']} {scope['path']} -> {status_code} in {elapsed * 1000:.0f} ms "
+                    f"({stats.queries} queries, {stats.db_seconds * 1000:.0f} ms SQL, "
+                    f"{stats.render_seconds * 1000:.0f} ms templates)"
+                )
+                for seconds, statement in sorted(stats.slowest, reverse=True):
+                    print(f"  {seconds * 1000:8.1f} ms  {' '.join(statement.split())}")
+
+if METRICS_ENABLED:
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    templates.env.template_class = TimedTemplate
+    app.add_middleware(MetricsMiddleware)
+
+# Health checks, unauthenticated for load balancers and orchestrators
+app_ready = threading.Event()  # set once lifespan startup is done, cleared at shutdown
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Ready when started, not shutting down, and the database answers at the latest schema version."""
+    if not app_ready.is_set():
+        return JSONResponse({"status": "not ready"}, status_code=503)
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(select(func.max(SchemaMigration.version))).scalar()
+    except SQLAlchemyError as e:
+        return JSONResponse({"status": "database unavailable", "detail": str(e.__cause__ or e)}, status_code=503)
+    if version != MIGRATIONS[-1][0]:
+        return JSONResponse({"status": "migrations pending", "schema_version": version}, status_code=503)
+    return {"status": "ready", "schema_version": version}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(route_metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Cross-worker invalidation
+# Each worker keeps its own caches (page cache versions, credentials, member search,
+# session revocations). Writers record what changed in the cache_versions table, and
+# every worker reads that table at most once per CACHE_SYNC_INTERVAL seconds, so a
+# change made in one process reaches the others within that interval. 0 keeps the
+# versions in-process, which is only correct with a single worker.
+CACHE_SYNC_INTERVAL = float(os.environ.get("CACHE_SYNC_INTERVAL", "1"))  # seconds
+
+class SharedVersions:
+    """Named version numbers shared between processes through cache_versions.
+
+    ``bump`` and ``set`` write the row and take effect in this process at once;
+    ``poll`` picks up rows other processes moved and passes each one to the
+    ``on_change`` listeners as ``(name, version)``.
+    """
+
+    def __init__(self, interval=CACHE_SYNC_INTERVAL):
+        self.interval = interval
+        self._versions = {}
+        self._listeners = []
+        self._polled_at = None
+        self._lock = threading.Lock()
+
+    def on_change(self, listener):
+        self._listeners.append(listener)
+
+    def get(self, name):
+        self.poll()
+        return self._versions.get(name, 0)
+
+    def bump(self, *names):
+        self._store({name: None for name in names})
+
+    def set(self, name, version):
+        self._store({name: version})
+
+    def _store(self, changes):
+        """Write ``{name: version}``; a version of None increments the current one."""
+        stored = {}
+        if self.interval > 0:
+            try:
+                with engine.begin() as conn:
+                    for name, version in changes.items():
+                        statement = upsert(conn.dialect.name, CacheVersion).values(name=name, version=version or 1)
+                        stored[name] = conn.execute(statement.on_conflict_do_update(
+                            index_elements=[CacheVersion.name],
+                            set_={"version": CacheVersion.version + 1 if version is None else version},
+                        ).returning(CacheVersion.version)).scalar()
+            except SQLAlchemyError as e:
+                # This process still sees the change; other workers see it when their cached pages expire
+                print(f"Could not publish cache versions {', '.join(changes)}: {e}")
+                stored = {}
+        with self._lock:
+            for name, version in changes.items():
+                current = self._versions.get(name, 0)
+                new = stored.get(name) or (current + 1 if version is None else version)
+                self._versions[name] = max(current, new)
+
+    def poll(self):
+        """Read cache_versions if the last read is more than ``interval`` seconds old."""
+        if self.interval <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._polled_at is not None and now - self._polled_at < self.interval:
+                return
+            self._polled_at = now
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(select(CacheVersion.name, CacheVersion.version)).all()
+        except SQLAlchemyError:
+            return  # try again next interval
+        changed = []
+        with self._lock:
+            for name, version in rows:
+                if version > self._versions.get(name, 0):
+                    self._versions[name] = version
+                    changed.append((name, version))
+        for name, version in changed:
+            for listener in self._listeners:
+                listener(name, version)
+
+shared_versions = SharedVersions()
+
 # Authentication
-def get_current_user(credentials: HTTPBasicCredentials = Depends(security), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == credentials.username).first()
-    if not user or user.password != credentials.password:
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+CREDENTIAL_CACHE_SIZE = 1024
+CREDENTIAL_CACHE_TTL = 300  # seconds
+
+class UserSnapshot(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    is_admin: bool = False
+
+def hash_password(password):
+    return pwd_context.hash(password)
+
+def verify_password(password, stored):
+    # Rows written before passwords were hashed hold plaintext; accept them until rehashed
+    if not stored:
+        return False
+    if pwd_context.identify(stored) is None:
+        return secrets.compare_digest(password.encode(), stored.encode())
+    return pwd_context.verify(password, stored)
+
+def authenticate(db: Session, username, password):
+    """Return the user for valid credentials, upgrading plaintext or outdated hashes in place."""
+    user = db.query(User).filter(User.username == username).first()
+    if not user or not verify_password(password, user.password):
+        return None
+    if pwd_context.identify(user.password) is None or pwd_context.needs_update(user.password):
+        user.password = hash_password(password)
+        db.commit()
+    return user
+
+class CredentialCache:
+    """Bounded LRU of verified credentials, so the password hash and user SELECT run once per TTL.
+
+    Entries are keyed by username and hold an HMAC of the password (never the
+    password itself) under a per-process key, plus a snapshot of the user.
+    """
+
+    def __init__(self, max_entries=CREDENTIAL_CACHE_SIZE, ttl=CREDENTIAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username, password):
+        return hmac.new(self._key, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+    def get(self, username, password):
+        digest = self._digest(username, password)
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            cached_digest, snapshot, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            if not hmac.compare_digest(cached_digest, digest):
+                return None
+            self._entries.move_to_end(username)
+            return snapshot
+
+    def put(self, username, password, snapshot):
+        entry = (self._digest(username, password), snapshot, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[username] = entry
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames):
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+credential_cache = CredentialCache()
+
+def user_snapshot(user):
+    return UserSnapshot(id=user.id, username=user.username, full_name=user.full_name, is_admin=bool(user.is_admin))
+
+# Sessions
+# /login sets a signed JWT cookie carrying the user's id, name and admin flag, so
+# page views authenticate without touching the database; HTTP Basic still works for
+# scripts and API clients. Every worker must share SESSION_SECRET; without it each
+# process signs with its own random key and sessions end on restart.
+SESSION_COOKIE = "library_session"
+SESSION_SECRET = os.environ.get("SESSION_SECRET") or secrets.token_urlsafe(32)
+SESSION_TTL = int(os.environ.get("SESSION_TTL", str(8 * 3600)))  # seconds
+SESSION_COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE", "0") == "1"
+SESSION_ALGORITHM = "HS256"
+
+class SessionRevocations:
+    """Per-username cut-off: tokens issued before a user was edited are refused.
+
+    Tokens are otherwise valid until they expire, so update_user records the
+    time here to end sessions that still carry an old admin flag or predate a
+    password change. ``iat`` has whole-second resolution, so the cut-off is the
+    second after the change: every token issued up to and including it is
+    refused, and tokens issued after it are dated from the cut-off on.
+    """
+
+    def __init__(self):
+        self._not_before = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, *usernames):
+        not_before = int(time.time()) + 1
+        for username in usernames:
+            self.cut_off(username, not_before)
+            shared_versions.set(f"user:{username}", not_before)
+
+    def cut_off(self, username, not_before):
+        with self._lock:
+            self._not_before[username] = max(not_before, self._not_before.get(username, 0))
+
+    def not_before(self, username):
+        return self._not_before.get(username, 0)
+
+    def is_revoked(self, username, issued_at):
+        return issued_at < self.not_before(username)
+
+session_revocations = SessionRevocations()
+
+def apply_remote_change(name, version):
+    """Drop what another worker invalidated (see SharedVersions)."""
+    if name.startswith("user:"):
+        username = name.removeprefix("user:")
+        credential_cache.invalidate(username)
+        session_revocations.cut_off(username, version)
+    elif name == "memberships":
+        cached_member_search.cache_clear()
+
+shared_versions.on_change(apply_remote_change)
+
+def create_session_token(user: UserSnapshot, now=None):
+    now = int(time.time()) if now is None else now
+    # A login in the same second as a revocation is dated after it, so it stays valid
+    now = max(now, session_revocations.not_before(user.username))
+    claims = {
+        "sub": user.username, "uid": user.id, "name": user.full_name, "adm": user.is_admin,
+        "iat": now, "exp": now + SESSION_TTL,
+    }
+    return jwt.encode(claims, SESSION_SECRET, algorithm=SESSION_ALGORITHM)
+
+def read_session_token(token):
+    """The UserSnapshot in a valid, unexpired and unrevoked token, else None."""
+    try:
+        claims = jwt.decode(token, SESSION_SECRET, algorithms=[SESSION_ALGORITHM])
+    except JWTError:
+        return None
+    if session_revocations.is_revoked(claims["sub"], claims["iat"]):
+        return None
+    return UserSnapshot(id=claims["uid"], username=claims["sub"], full_name=claims.get("name"), is_admin=claims.get("adm", False))
+
+def get_current_user(request: Request, credentials: Optional[HTTPBasicCredentials] = Depends(security)):
+    shared_versions.poll()  # revocations and cache invalidations from other workers
+    token = request.cookies.get(SESSION_COOKIE)
+    if token:
+        user = read_session_token(token)
+        if user is not None:
+            return user
+
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
+    user = credential_cache.get(credentials.username, credentials.password)
+    if user is not None:
+        return user
+
+    db = SessionLocal()
+    try:
+        found = authenticate(db, credentials.username, credentials.password)
+        if found:
+            user = user_snapshot(found)
+    finally:
+        db.close()
+
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
+    credential_cache.put(credentials.username, credentials.password, user)
     return user
 
+# Pagination
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+BOOK_SORT_KEYS = {"id": Book.id, "title": Book.title, "author": Book.author}
+WORK_SORT_KEYS = {"id": Work.id, "title": Work.title, "author": Work.author}
+MEMBERSHIP_SORT_KEYS = {"id": Membership.id, "name": Membership.first_name, "end_date": Membership.end_date}
+USER_SORT_KEYS = {"id": User.id, "username": User.username}
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    sort: str
+    limit: int
+    sort_keys: list
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id], default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, date_value=False):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if date_value and sort_value is not None:
+            sort_value = datetime.strptime(sort_value, "%Y-%m-%d").date()
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
+
+def keyset_page(query, model, sort_keys, sort="id", after=None, before=None, limit=PAGE_SIZE, descending=False):
+    """Return one page of ``query`` ordered by ``(sort, id)`` using seek pagination.
+
+    ``after``/``before`` are opaque cursors taken from a previous page, so the
+    database seeks straight to the boundary row instead of counting an OFFSET.
+    ``descending`` lists newest first; "after" then means further down the list.
+    NULL sort values (e.g. an old book without a title) come before every other
+    value, as SQLite orders them, and a page may run across that boundary.
+    """
+    if sort not in sort_keys:
+        raise HTTPException(status_code=400, detail="Invalid sort key")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    sort_column = sort_keys[sort]
+
+    def cursor_for(row):
+        return encode_cursor(getattr(row, sort_column.key), row.id)
+
+    def ordered(forward):
+        if sort == "id":
+            return [model.id.asc() if forward != descending else model.id.desc()]
+        if forward != descending:
+            return [sort_column.asc().nulls_first(), model.id.asc()]
+        return [sort_column.desc().nulls_last(), model.id.desc()]
+
+    def past(cursor, forward):
+        """Conditions for the rows beyond ``cursor`` in reading order, one seek each."""
+        sort_value, row_id = decode_cursor(cursor, date_value=sort != "id" and isinstance(sort_column.type, Date))
+        upward = forward != descending
+        beyond_id = model.id > row_id if upward else model.id < row_id
+        if sort == "id":
+            return [beyond_id]
+        if sort_value is None:
+            nulls = and_(sort_column == None, beyond_id)
+            return [nulls, sort_column != None] if upward else [nulls]
+        key, boundary = tuple_(sort_column, model.id), tuple_(sort_value, row_id)
+        return [key > boundary] if upward else [key < boundary, sort_column == None]
+
+    def read(conditions, forward):
+        rows = []
+        for condition in conditions:
+            rows += query.filter(condition).order_by(*ordered(forward)).limit(limit + 1 - len(rows)).all()
+            if len(rows) > limit:
+                break
+        return rows
+
+    if before:
+        rows = read(past(before, False), False)
+        has_more = len(rows) > limit
+        items = list(reversed(rows[:limit]))
+        next_cursor = cursor_for(items[-1]) if items else None
+        prev_cursor = cursor_for(items[0]) if items and has_more else None
+    else:
+        rows = read(past(after, True), True) if after else query.order_by(*ordered(True)).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = cursor_for(items[-1]) if items and has_more else None
+        prev_cursor = cursor_for(items[0]) if items and after else None
+    return Page(items, next_cursor, prev_cursor, sort, limit, list(sort_keys))
+
+# Report queries
+# Open loans are listed by due date; streamed reports page through them by (return_date, id)
+OPEN_LOAN_SORT_KEYS = {"return_date": Transaction.return_date}
+
+def open_transactions_query(db: Session, overdue=False, today=None):
+    """Open loans with their book title and member name, as one joined SELECT.
+
+    Rows expose ``id``, ``issue_date``, ``return_date``, ``book_title``,
+    ``first_name`` and ``last_name`` so report templates never lazy-load
+    ``transaction.book`` / ``transaction.member`` row by row. Overdue rows
+    also carry ``days_overdue`` and ``accrued_fine`` as of ``today``.
+    """
+    query = (
+        db.query(
+            Transaction.id,
+            Transaction.issue_date,
+            Transaction.return_date,
+            Book.title.label("book_title"),
+            Membership.first_name,
+            Membership.last_name,
+        )
+        .join(Book, Transaction.book_id == Book.id)
+        .join(Membership, Transaction.member_id == Membership.id)
+        .filter(Transaction.actual_return_date == None)
+    )
+    if overdue:
+        # Decided from return_date, not the sweep's is_overdue, so a loan is listed (with its
+        # fine to date) the day it falls due; still a range read of ix_transactions_open_return_date
+        today = today or datetime.now().date()
+        late = days_late(today, db.get_bind().dialect.name)
+        query = query.filter(Transaction.return_date < today).add_columns(
+            late.label("days_overdue"), (late * FINE_PER_DAY).label("accrued_fine"),
+        )
+    return query.order_by(Transaction.return_date, Transaction.id)
+
+def open_transactions_report(db: Session, overdue=False, today=None):
+    return open_transactions_query(db, overdue, today).all()
+
+# A member's loans, hot and archived, with the copy's title; paged newest first with
+# keyset_page(member_history_query(db, member_id), history.c, HISTORY_SORT_KEYS, ...)
+history = loan_history("id", "member_id", "book_id", "issue_date", "return_date", "actual_return_date", "fine_amount", "fine_paid")
+HISTORY_SORT_KEYS = {"issue_date": history.c.issue_date}
+
+def member_history_query(db: Session, member_id):
+    """Read from ix_transactions_member_id_issue_date and its archive counterpart."""
+    return (
+        db.query(
+            history.c.id,
+            history.c.issue_date,
+            history.c.return_date,
+            history.c.actual_return_date,
+            history.c.fine_amount,
+            history.c.fine_paid,
+            Book.title.label("book_title"),
+            Book.serial_number,
+        )
+        .join(Book, history.c.book_id == Book.id)
+        .filter(history.c.member_id == member_id)
+    )
+
+# Analytics
+ANALYTICS_LIMIT = 10
+ANALYTICS_GROUPS = {
+    "title": (Work.id, Work.title, Work.author),
+    "author": (Work.author,),
+    "genre": (Work.genre,),
+}
+
+def month_end(day):
+    following = day.replace(day=28) + timedelta(days=4)
+    return following - timedelta(days=following.day)
+
+def add_months(day, months):
+    """First day of the month ``months`` away from ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def top_borrowed(db: Session, by, start, end, limit=ANALYTICS_LIMIT):
+    """The most-borrowed titles, authors or genres among loans issued from ``start`` to ``end`` inclusive.
+
+    Whole-month ranges add up the monthly_loans rollup. Other ranges count
+    loans per copy from the (book_id, issue_date) indexes of the hot and
+    archive tables alone, then join only the copies that were borrowed.
+    """
+    columns = ANALYTICS_GROUPS[by]
+    if start.day == 1 and end == month_end(end):
+        loans = func.sum(MonthlyLoans.loans).label("loans")
+        query = (
+            db.query(*columns, loans)
+            .select_from(MonthlyLoans)
+            .join(Work, Work.id == MonthlyLoans.work_id)
+            .filter(MonthlyLoans.month.between(start, end))
+        )
+    else:
+        loans_in_range = loan_history("book_id", "issue_date")
+        per_copy = (
+            select(loans_in_range.c.book_id, func.count().label("loans"))
+            .where(loans_in_range.c.issue_date.between(start, end))
+            .group_by(loans_in_range.c.book_id)
+            .subquery()
+        )
+        loans = func.sum(per_copy.c.loans).label("loans")
+        query = (
+            db.query(*columns, loans)
+            .select_from(per_copy)
+            .join(Book, Book.id == per_copy.c.book_id)
+            .join(Work, Work.id == Book.work_id)
+        )
+    return query.group_by(*columns).order_by(loans.desc(), *columns).limit(limit).all()
+
+def fines_by_month(db: Session, start, end):
+    """Fines assessed and collected per month of return, from the monthly_fines rollup."""
+    return (
+        db.query(MonthlyFines)
+        .filter(MonthlyFines.month.between(start.replace(day=1), end))
+        .order_by(MonthlyFines.month)
+        .all()
+    )
+
+# Overdue sweep
+OVERDUE_SWEEP_INTERVAL = int(os.environ.get("OVERDUE_SWEEP_INTERVAL", 900))  # seconds; 0 disables
+SWEEP_BATCH_SIZE = 1000
+
+def sweep_overdue(db: Session, today=None, batch_size=SWEEP_BATCH_SIZE):
+    """Persist ``is_overdue`` and ``accrued_fine`` for every open loan past its due date.
+
+    Walks the open, past-due loans in (return_date, id) order through the
+    partial open-loans index, one batch and one commit at a time, so the
+    sweep never holds the write lock for long. Returns the number of rows updated.
+    """
+    today = today or datetime.now().date()
+    updated = 0
+    boundary = None
+    while True:
+        query = db.query(Transaction.id, Transaction.return_date, Transaction.accrued_fine, Transaction.is_overdue).filter(
+            Transaction.actual_return_date == None, Transaction.return_date < today
+        )
+        if boundary:
+            query = query.filter(tuple_(Transaction.return_date, Transaction.id) > tuple_(*boundary))
+        rows = query.order_by(Transaction.return_date, Transaction.id).limit(batch_size).all()
+        if not rows:
+            break
+        changes = []
+        for row in rows:
+            fine = compute_fine(row.return_date, today)
+            if row.accrued_fine != fine or not row.is_overdue:
+                changes.append({"id": row.id, "accrued_fine": fine, "is_overdue": True})
+        if changes:
+            db.execute(update(Transaction), changes)
+            db.commit()
+            updated += len(changes)
+        boundary = (rows[-1].return_date, rows[-1].id)
+    return updated
+
+def sweep_overdue_once():
+    db = SessionLocal()
+    try:
+        updated = sweep_overdue(db)
+        expired = expire_holds(db)
+    finally:
+        db.close()
+    if updated:
+        response_cache.bump("transactions")
+    if expired:
+        response_cache.bump("books", "holds")
+    return updated
+
+async def run_overdue_sweeper():
+    while True:
+        try:
+            updated = await asyncio.to_thread(sweep_overdue_once)
+            if updated:
+                print(f"Overdue sweep updated {updated} loans")
+        except Exception as e:
+            print(f"Overdue sweep failed: {e}")
+        await asyncio.sleep(OVERDUE_SWEEP_INTERVAL)
+
+# Streaming reports
+STREAM_BATCH_SIZE = 500
+STREAM_BUFFER = 200  # template output pieces per chunk sent
+
+def stream_report(template_name, context, items_name, build_query, model, sort_keys, sort):
+    """Render a report while its rows are still being fetched.
+
+    ``build_query(db)`` is read in keyset pages of STREAM_BATCH_SIZE rows, ordered
+    by ``(sort, id)``, each on a short-lived session that is closed before its rows
+    are rendered, so a client reading slowly never holds a read lock that would
+    block writers. The template is fed through Jinja's ``stream()``, so the first
+    bytes go out immediately and memory stays flat however many rows the report has.
+    """
+    def fetch():
+        after = None
+        while True:
+            db = SessionLocal()
+            try:
+                page = keyset_page(build_query(db).order_by(None), model, sort_keys, sort, after=after, limit=STREAM_BATCH_SIZE)
+            finally:
+                db.close()
+            yield from page.items
+            if not page.next_cursor:
+                break
+            after = page.next_cursor
+
+    def body():
+        rows = fetch()
+        first = next(rows, None)
+        items = itertools.chain([first], rows) if first is not None else []
+        stream = templates.get_template(template_name).stream({**context, items_name: items})
+        stream.enable_buffering(STREAM_BUFFER)
+        yield from stream
+
+    return StreamingResponse(body(), media_type="text/html")
+
+# Response cache
+# Report pages are cached per route, query string and role. Each cached page is tagged
+# with the versions of the tables it reads; writers bump those versions after they
+# commit, so a stale page is simply never looked up again. By default pages live in an
+# in-process LRU and the versions in shared_versions, so every worker stops serving a
+# page within CACHE_SYNC_INTERVAL of any worker's write; RESPONSE_CACHE_URL
+# (redis://...) shares the pages and versions themselves. The TTL bounds staleness
+# from writers that bypass the app, such as a manual SQL fix.
+RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "300"))  # seconds
+
+class LocalResponseCache:
+    """Bounded LRU of rendered pages in this process, tagged with the shared table versions."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def versions(self, tables):
+        return [shared_versions.get(table) for table in tables]
+
+    def bump(self, *tables):
+        shared_versions.bump(*tables)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            etag, body, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag, body
+
+    def put(self, key, etag, body):
+        with self._lock:
+            self._entries[key] = (etag, body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisResponseCache:
+    """The same interface backed by Redis, so every worker sees the same pages and versions.
+
+    Size is bounded by the server's own maxmemory policy; entries expire after the TTL.
+    """
+
+    prefix = "library:responses:"
+
+    def __init__(self, url, ttl=RESPONSE_CACHE_TTL):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_URL is set but the redis package is not installed")
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def versions(self, tables):
+        values = self._client.mget([f"{self.prefix}version:{table}" for table in tables])
+        return [int(value or 0) for value in values]
+
+    def bump(self, *tables):
+        with self._client.pipeline() as pipe:
+            for table in tables:
+                pipe.incr(f"{self.prefix}version:{table}")
+            pipe.execute()
+        shared_versions.bump(*tables)  # for the other in-process caches, e.g. member search
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, body = value.split(b"\n", 1)
+        return etag.decode(), body
+
+    def put(self, key, etag, body):
+        self._client.set(self.prefix + key, etag.encode() + b"\n" + body, ex=self.ttl)
+
+response_cache = RedisResponseCache(RESPONSE_CACHE_URL) if RESPONSE_CACHE_URL else LocalResponseCache()
+
+def etag_matches(request: Request, etag):
+    candidates = request.headers.get("if-none-match", "")
+    return any(candidate.strip().removeprefix("W/") in (etag, "*") for candidate in candidates.split(","))
+
+def cached_page(request: Request, user: UserSnapshot, tables, render, *extra_key):
+    """Serve ``render()``'s page from the response cache, honouring If-None-Match.
+
+    ``tables`` lists what the page reads; the cache key covers the path, query
+    string, the viewer's role, those tables' current versions and ``extra_key``.
+    """
+    versions = response_cache.versions(tables)
+    key = "|".join(str(part) for part in (
+        request.url.path, request.url.query, int(user.is_admin), *versions, *extra_key
+    ))
+    entry = response_cache.get(key)
+    if entry is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+        etag = '"' + hashlib.sha1(response.body).hexdigest() + '"'
+        entry = (etag, response.body)
+        response_cache.put(key, *entry)
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+# Circulation
+LOAN_PERIOD_DAYS = 15
+FINE_PER_DAY = 10.0  # Rs.
+
+class CirculationError(Exception):
+    """A circulation rule was broken; the message is shown to staff as-is."""
+
+class CopyUnavailable(CirculationError):
+    """The copy is out (or set aside for someone else); a hold can be placed on it instead."""
+
+def issue_copy(db: Session, book_id, member_id, issue_date, return_date, remarks=None):
+    """Issue a book inside the caller's transaction; the caller commits.
+
+    The status flip is a single conditional UPDATE (compare-and-set), so when
+    several clerks issue the same copy at once exactly one UPDATE matches and
+    every other caller gets CopyUnavailable instead of a double issue. A copy
+    that is On hold is issued only to the member whose hold is Ready.
+    """
+    if issue_date < datetime.now().date():
+        raise CirculationError("Issue date cannot be in the past")
+    if return_date > issue_date + timedelta(days=LOAN_PERIOD_DAYS):
+        raise CirculationError(f"Return date cannot be more than {LOAN_PERIOD_DAYS} days from issue date")
+
+    claimed = db.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.status == "Available")
+        .values(status="Issued")
+        .returning(Book.work_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if claimed is not None:
+        adjust_available(db, {claimed.work_id: -1})
+    else:
+        claimed = collect_hold(db, book_id, member_id)
+        if claimed is None:
+            raise CopyUnavailable("Book not available")
+    record_loans(db, issue_date, {claimed.work_id: 1})
+
+    transaction = Transaction(
+        book_id=book_id,
+        member_id=member_id,
+        issue_date=issue_date,
+        return_date=return_date,
+        remarks=remarks
+    )
+    db.add(transaction)
+    bump_open_loans(db, return_date, 1)
+    db.flush()
+    return transaction
+
+def compute_fine(return_date, actual_return_date):
+    if actual_return_date > return_date:
+        return (actual_return_date - return_date).days * FINE_PER_DAY
+    return 0.0
+
+def release_copies(db: Session, book_ids, from_status="Issued"):
+    """Mark books Available again with one set-based UPDATE and credit their works,
+    then hand each one whose title has a waiting hold to the first member in its queue.
+    """
+    if book_ids:
+        released = db.execute(
+            update(Book)
+            .where(Book.id.in_(book_ids), Book.status == from_status)
+            .values(status="Available")
+            .returning(Book.work_id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+        adjust_available(db, Counter(released))
+        assign_holds(db, book_ids)
+
+class BatchReturnItem(BaseModel):
+    transaction_id: Optional[int] = None
+    serial_number: Optional[str] = None
+    actual_return_date: date
+
+class BatchReturnRequest(BaseModel):
+    items: List[BatchReturnItem]
+
+class BatchIssueItem(BaseModel):
+    book_id: Optional[int] = None
+    serial_number: Optional[str] = None
+    member_id: Optional[int] = None  # defaults to the request's member_id
+
+class BatchIssueRequest(BaseModel):
+    member_id: Optional[int] = None
+    issue_date: date
+    return_date: date
+    remarks: Optional[str] = None
+    items: List[BatchIssueItem]
+
+def return_copies(db: Session, items):
+    """Close many loans at once (drop-box processing); the caller commits.
+
+    Loans are looked up with one query per key type, closed with one
+    executemany UPDATE, and copies without a fine are released with one
+    set-based UPDATE. Copies with a fine stay Issued until pay_fine, exactly
+    as in return_book. Returns one result dict per item, in order.
+    """
+    ids = [item.transaction_id for item in items if item.transaction_id is not None]
+    serials = [item.serial_number for item in items if item.transaction_id is None and item.serial_number]
+    by_id = {}
+    by_serial = {}
+    if ids:
+        by_id = {t.id: t for t in db.query(Transaction.id, Transaction.book_id, Transaction.return_date, Transaction.actual_return_date)
+                 .filter(Transaction.id.in_(ids))}
+    if serials:
+        by_serial = {t.serial_number: t for t in db.query(
+            Transaction.id, Transaction.book_id, Transaction.return_date, Transaction.actual_return_date, Book.serial_number)
+            .join(Book, Transaction.book_id == Book.id)
+            .filter(Book.serial_number.in_(serials), Transaction.actual_return_date == None)}
+
+    results = []
+    closed = []
+    released = []
+    due_dates = Counter()
+    assessed_by_month = Counter()
+    fines_total = 0.0
+    seen = set()
+    for item in items:
+        result = {"transaction_id": item.transaction_id, "serial_number": item.serial_number}
+        results.append(result)
+        loan = by_id.get(item.transaction_id) if item.transaction_id is not None else by_serial.get(item.serial_number)
+        if loan is None:
+            result.update(status="error", error="No open loan found")
+            continue
+        if loan.actual_return_date is not None:
+            result.update(status="error", error="Book already returned")
+            continue
+        if loan.id in seen:
+            result.update(status="error", error="Duplicate item in batch")
+            continue
+        seen.add(loan.id)
+
+        fine = compute_fine(loan.return_date, item.actual_return_date)
+        closed.append({"id": loan.id, "actual_return_date": item.actual_return_date, "fine_amount": fine})
+        due_dates[loan.return_date] += 1
+        assessed_by_month[item.actual_return_date.replace(day=1)] += fine
+        fines_total += fine
+        if fine:
+            result.update(transaction_id=loan.id, status="fine_due", fine_amount=fine)
+        else:
+            released.append(loan.book_id)
+            result.update(transaction_id=loan.id, status="returned", fine_amount=0.0)
+
+    if closed:
+        db.execute(update(Transaction), closed)
+    release_copies(db, released)
+    for return_date, count in due_dates.items():
+        bump_open_loans(db, return_date, -count)
+    for month, fines in assessed_by_month.items():
+        record_fines(db, month, assessed=fines)
+    bump_counters(db, fines_outstanding=fines_total)
+    return results
+
+def settle_fine(db: Session, transaction, fine_paid, remarks=None):
+    """Record whether a returned loan's fine is paid; the caller commits.
+
+    Moves the fine between the outstanding and collected counters. A loan
+    returned with a fine keeps its copy out until the fine is paid, so paying
+    an unpaid fine releases the copy, provided this is still the copy's latest
+    loan (once released, the copy may have gone out again). Raises
+    CirculationError for a loan that has not been returned.
+    """
+    if transaction.actual_return_date is None:
+        raise CirculationError("Book has not been returned")
+    holds_copy = bool(fine_paid and not transaction.fine_paid and transaction.fine_amount) and not db.query(
+        exists().where(Transaction.book_id == transaction.book_id, Transaction.id > transaction.id)
+    ).scalar()
+
+    if fine_paid and not transaction.fine_paid and transaction.fine_amount:
+        bump_counters(db, fines_outstanding=-transaction.fine_amount, fines_collected=transaction.fine_amount)
+        record_fines(db, transaction.actual_return_date, collected=transaction.fine_amount)
+    elif not fine_paid and transaction.fine_paid and transaction.fine_amount:
+        bump_counters(db, fines_outstanding=transaction.fine_amount, fines_collected=-transaction.fine_amount)
+        record_fines(db, transaction.actual_return_date, collected=-transaction.fine_amount)
+
+    transaction.fine_paid = fine_paid
+
+    if remarks:
+        transaction.remarks = remarks
+
+    if holds_copy:
+        release_copies(db, [transaction.book_id])
+
+def issue_copies(db: Session, request: BatchIssueRequest):
+    """Issue many books at once (class/group loans); the caller commits.
+
+    All requested copies are claimed with one conditional UPDATE ... RETURNING,
+    so copies that are already out are reported per item rather than
+    double-issued, and the loans are inserted with one executemany INSERT.
+    """
+    if request.issue_date < datetime.now().date():
+        raise CirculationError("Issue date cannot be in the past")
+    if request.return_date > request.issue_date + timedelta(days=LOAN_PERIOD_DAYS):
+        raise CirculationError(f"Return date cannot be more than {LOAN_PERIOD_DAYS} days from issue date")
+
+    serials = [item.serial_number for item in request.items if item.book_id is None and item.serial_number]
+    serial_ids = dict(db.query(Book.serial_number, Book.id).filter(Book.serial_number.in_(serials))) if serials else {}
+
+    results = []
+    wanted = {}
+    for item in request.items:
+        book_id = item.book_id if item.book_id is not None else serial_ids.get(item.serial_number)
+        member_id = item.member_id or request.member_id
+        result = {"book_id": book_id, "serial_number": item.serial_number, "member_id": member_id}
+        results.append(result)
+        if book_id is None:
+            result.update(status="error", error="Book not found")
+        elif member_id is None:
+            result.update(status="error", error="member_id is required")
+        elif book_id in wanted:
+            result.update(status="error", error="Duplicate item in batch")
+        else:
+            wanted[book_id] = result
+
+    claimed = {}
+    if wanted:
+        claimed = dict(db.execute(
+            update(Book)
+            .where(Book.id.in_(list(wanted)), Book.status == "Available")
+            .values(status="Issued")
+            .returning(Book.id, Book.work_id)
+            .execution_options(synchronize_session=False)
+        ).all())
+        adjust_available(db, {work_id: -count for work_id, count in Counter(claimed.values()).items()})
+
+    loans = []
+    for book_id, result in wanted.items():
+        if book_id in claimed:
+            loans.append({
+                "book_id": book_id, "member_id": result["member_id"], "issue_date": request.issue_date,
+                "return_date": request.return_date, "remarks": request.remarks, "fine_amount": 0.0, "fine_paid": False,
+            })
+            result["status"] = "issued"
+        else:
+            result.update(status="error", error="Book not available")
+    if loans:
+        db.execute(insert(Transaction), loans)
+        bump_open_loans(db, request.return_date, len(loans))
+        record_loans(db, request.issue_date, Counter(claimed.values()))
+    return results
+
+# Holds
+# A title with no copy on the shelf can be held: the member joins its Work's queue (Hold
+# rows, served first come, first served). Whatever puts a copy of it on the shelf
+# (return_book, pay_fine, batch returns, cancelling or expiring a Ready hold, adding a
+# copy) goes through assign_holds, which sets that copy aside for the next hold in the
+# same transaction. A Ready hold not collected within HOLD_PICKUP_DAYS expires in the
+# overdue sweep.
+HOLD_PICKUP_DAYS = int(os.environ.get("HOLD_PICKUP_DAYS", "3"))
+OPEN_HOLD_STATUSES = ("Waiting", "Ready")
+
+def assign_holds(db: Session, book_ids, today=None):
+    """Set aside each Available copy in ``book_ids`` whose title has Waiting holds for
+    the oldest of them, one hold per copy; the caller commits. Returns the holds made
+    Ready as dicts with ``id``, ``book_id`` and ``member_id``.
+    """
+    today = today or date.today()
+    copies = db.execute(
+        select(Book.id, Book.work_id)
+        .where(Book.id.in_(book_ids), Book.status == "Available",
+               exists().where(Hold.work_id == Book.work_id, Hold.status == "Waiting"))
+        .order_by(Book.id)
+    ).all()
+    if not copies:
+        return []
+    free = {}
+    for book_id, work_id in copies:
+        free.setdefault(work_id, []).append(book_id)
+    waiting = db.execute(
+        select(Hold.id, Hold.work_id, Hold.member_id)
+        .where(Hold.work_id.in_(list(free)), Hold.status == "Waiting")
+        .order_by(Hold.created_at, Hold.id)
+    ).all()
+    ready = []
+    for hold in waiting:
+        if free[hold.work_id]:
+            ready.append({"id": hold.id, "book_id": free[hold.work_id].pop(0), "member_id": hold.member_id})
+
+    held = db.execute(
+        update(Book)
+        .where(Book.id.in_([hold["book_id"] for hold in ready]), Book.status == "Available")
+        .values(status="On hold")
+        .returning(Book.work_id)
+        .execution_options(synchronize_session=False)
+    ).scalars()
+    adjust_available(db, {work_id: -count for work_id, count in Counter(held).items()})
+    db.execute(update(Hold), [
+        {"id": hold["id"], "book_id": hold["book_id"], "status": "Ready", "ready_on": today} for hold in ready
+    ])
+    return ready
+
+def collect_hold(db: Session, book_id, member_id):
+    """Fulfil ``member_id``'s Ready hold on a copy and mark the copy Issued.
+
+    Returns the claimed copy's row (with ``work_id``) like issue_copy's own
+    claim, or None when the copy is not set aside for this member.
+    """
+    fulfilled = db.execute(
+        update(Hold)
+        .where(Hold.book_id == book_id, Hold.member_id == member_id, Hold.status == "Ready")
+        .values(status="Fulfilled")
+        .returning(Hold.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if fulfilled is None:
+        return None
+    return db.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.status == "On hold")
+        .values(status="Issued")
+        .returning(Book.work_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def place_hold(db: Session, book_id, member_id, today=None):
+    """Queue a member for the title of copy ``book_id``; the caller commits.
+
+    Refused while any copy of the title is on the shelf (issue that one
+    instead). A copy returned in the meantime is set aside at once, so the
+    returned Hold is either Waiting or already Ready.
+    """
+    today = today or date.today()
+    book = db.get(Book, book_id)
+    if book is None or book.work_id is None:
+        raise CirculationError("Book not found")
+    if db.get(Work, book.work_id).available_count:
+        raise CirculationError("A copy of this title is available; issue it instead")
+    member = db.get(Membership, member_id)
+    if member is None:
+        raise CirculationError("Member not found")
+    if member.end_date and member.end_date < today:
+        raise CirculationError("Membership has expired")
+    if db.query(Hold.id).filter(Hold.work_id == book.work_id, Hold.member_id == member_id, Hold.status.in_(OPEN_HOLD_STATUSES)).first():
+        raise CirculationError("Member already has a hold on this title")
+
+    hold = Hold(work_id=book.work_id, book_id=book_id, member_id=member_id, created_at=datetime.now(), status="Waiting")
+    db.add(hold)
+    db.flush()
+    assign_holds(db, select(Book.id).where(Book.work_id == book.work_id, Book.status == "Available"), today=today)
+    db.refresh(hold)
+    return hold
+
+def close_hold(db: Session, hold, status="Cancelled"):
+    """End an open hold; a copy it had set aside goes to the next in the queue or back on the shelf."""
+    if hold.status not in OPEN_HOLD_STATUSES:
+        raise CirculationError(f"Hold is already {hold.status.lower()}")
+    was_ready = hold.status == "Ready"
+    hold.status = status
+    db.flush()
+    if was_ready:
+        release_copies(db, [hold.book_id], from_status="On hold")
+
+def expire_holds(db: Session, today=None):
+    """Expire Ready holds not collected within HOLD_PICKUP_DAYS and pass their copies on.
+
+    Commits, and returns the number of holds expired.
+    """
+    today = today or datetime.now().date()
+    expired = db.execute(
+        update(Hold)
+        .where(Hold.status == "Ready", Hold.ready_on < today - timedelta(days=HOLD_PICKUP_DAYS))
+        .values(status="Expired")
+        .returning(Hold.book_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if expired:
+        release_copies(db, expired, from_status="On hold")
+        db.commit()
+    return len(expired)
+
+def open_holds(db: Session):
+    """Waiting and Ready holds, oldest first, as dicts with the title, the member's
+    name and the hold's place in its title's queue (0 once Ready, with the serial
+    number of the copy set aside).
+    """
+    rows = (
+        db.query(
+            Hold.id, Hold.work_id, Hold.book_id, Hold.member_id, Hold.created_at, Hold.status, Hold.ready_on,
+            Work.title.label("book_title"), Book.serial_number, Membership.first_name, Membership.last_name,
+        )
+        .join(Work, Hold.work_id == Work.id)
+        .join(Book, Hold.book_id == Book.id)
+        .join(Membership, Hold.member_id == Membership.id)
+        .filter(Hold.status.in_(OPEN_HOLD_STATUSES))
+        .order_by(Hold.created_at, Hold.id)
+    )
+    queued = Counter()
+    holds = []
+    for row in rows:
+        if row.status == "Waiting":
+            queued[row.work_id] += 1
+        holds.append({
+            "id": row.id,
+            "work_id": row.work_id,
+            "book_id": row.book_id,
+            "member_id": row.member_id,
+            "member_name": f"{row.first_name} {row.last_name}",
+            "book_title": row.book_title,
+            "serial_number": row.serial_number if row.status == "Ready" else None,
+            "request_date": row.created_at.strftime("%Y-%m-%d %H:%M"),
+            "status": row.status,
+            "position": queued[row.work_id] if row.status == "Waiting" else 0,
+            "ready_on": row.ready_on.isoformat() if row.ready_on else None,
+        })
+    return holds
+
+@lru_cache(maxsize=4)
+def cached_open_holds(version):
+    """open_holds for one version of "holds", shared by every event stream in this process."""
+    db = SessionLocal()
+    try:
+        return tuple(open_holds(db))
+    finally:
+        db.close()
+
+# Bulk import/export
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MODELS = {
+    "books": Book, "works": Work, "memberships": Membership,
+    "transactions": Transaction, "transactions_archive": TransactionArchive, "holds": Hold,
+}
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y", "movie")
+
+def read_catalogue(lines, file_format):
+    """Yield ``(row_number, record)`` from an iterable of CSV or JSON Lines text lines."""
+    if file_format == "csv":
+        for row_number, record in enumerate(csv.DictReader(lines), start=2):  # row 1 is the header
+            yield row_number, record
+    elif file_format == "jsonl":
+        for row_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {"_error": f"Invalid JSON: {e}"}
+            yield row_number, record if isinstance(record, dict) else {"_error": "Expected a JSON object"}
+    else:
+        raise ValueError(f"Unsupported format {file_format!r}; expected csv or jsonl")
+
+def import_books(db: Session, records, batch_size=IMPORT_BATCH_SIZE):
+    """Insert catalogue records in batches, one executemany INSERT and commit per batch.
+
+    Serial numbers already in the catalogue, or repeated within the upload,
+    are reported per row instead of aborting the import.
+    """
+    imported = 0
+    errors = []
+
+    def flush(batch):
+        serials = [book["serial_number"] for _, book in batch]
+        existing = set(db.scalars(select(Book.serial_number).where(Book.serial_number.in_(serials))))
+        rows = []
+        for row_number, book in batch:
+            if book["serial_number"] in existing:
+                errors.append({"row": row_number, "serial_number": book["serial_number"], "error": "Serial number already exists"})
+            else:
+                rows.append(book)
+        if rows:
+            db.execute(insert(Book), rows)
+            attach_copies(db)
+            assign_holds(db, select(Book.id).where(Book.serial_number.in_([book["serial_number"] for book in rows])))
+            movies = sum(1 for book in rows if book["is_movie"])
+            bump_counters(db, books=len(rows) - movies, movies=movies)
+            db.commit()
+        return len(rows)
+
+    batch = []
+    batch_serials = set()
+    for row_number, record in records:
+        serial_number = str(record.get("serial_number") or "").strip()
+        title = str(record.get("title") or "").strip()
+        if "_error" in record:
+            errors.append({"row": row_number, "serial_number": None, "error": record["_error"]})
+            continue
+        if not serial_number or not title:
+            errors.append({"row": row_number, "serial_number": serial_number or None, "error": "title and serial_number are required"})
+            continue
+        if serial_number in batch_serials:
+            errors.append({"row": row_number, "serial_number": serial_number, "error": "Duplicate serial number in upload"})
+            continue
+        batch_serials.add(serial_number)
+        batch.append((row_number, {
+            "title": title,
+            "author": str(record.get("author") or "").strip(),
+            "is_movie": parse_bool(record.get("is_movie")),
+            "genre": str(record.get("genre") or "").strip(),
+            "serial_number": serial_number,
+            "status": "Available",
+        }))
+        if len(batch) >= batch_size:
+            imported += flush(batch)
+            batch = []
+            batch_serials = set()  # earlier batches are committed, so flush() catches repeats of them
+    if batch:
+        imported += flush(batch)
+    errors.sort(key=lambda error: error["row"])
+    return {"imported": imported, "errors": errors}
+
+def export_rows(model, file_format, batch_size=EXPORT_BATCH_SIZE):
+    """Yield a table as CSV or JSON Lines text, ``batch_size`` rows at a time.
+
+    Each batch is its own short SELECT (id > last id seen), run on a connection
+    that goes back to the pool before the batch is yielded, so a slow download
+    never holds a read lock that would block writers.
+    """
+    columns = [column.name for column in model.__table__.columns]
+    statement = select(*model.__table__.columns).order_by(model.id).limit(batch_size)
+    last_id = None
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(statement if last_id is None else statement.where(model.id > last_id)).all()
+        if file_format == "csv":
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        elif rows:
+            yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1].id
+
+# Menus and blank forms depend only on the user's role, so each is rendered once per
+# role and served from memory. A query string (the ?error=... flash message) makes the
+# page dynamic, so those requests render as usual.
+static_pages = {}
+
+def static_page(request: Request, name: str, is_admin: bool = False):
+    if request.url.query or TEMPLATE_AUTO_RELOAD:
+        return templates.TemplateResponse(name, {"request": request, "is_admin": is_admin})
+    key = (name, is_admin)
+    html = static_pages.get(key)
+    if html is None:
+        html = static_pages[key] = templates.get_template(name).render(request=request, is_admin=is_admin)
+    return HTMLResponse(html)
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("start.html", {"request": request})
+    return static_page(request, "start.html")
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return static_page(request, "login.html")
 
 @app.post("/login")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    # Print to console for debugging
-    print(f"Login attempt: username={username}, password={password}")
-    
-    user = db.query(User).filter(User.username == username).first()
+def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+    user = authenticate(db, username, password)
     
-    # Debug: Check if user exists
-    if user:
-        print(f"User found: {user.username}, is_admin: {user.is_admin}")
-        print(f"Stored password: {user.password}")
-    else:
-        print("User not found in database")
-    
-    if not user or user.password != password:
+    if not user:
         return templates.TemplateResponse(
             "login.html", 
             {"request": request, "error": "Invalid username or password"}
         )
     
-    # In a real app, you'd use sessions, but for simplicity, we'll use basic auth
-    return RedirectResponse(url="/book-categories", status_code=303)
+    response = RedirectResponse(url="/book-categories", status_code=303)
+    response.set_cookie(
+        SESSION_COOKIE, create_session_token(user_snapshot(user)), max_age=SESSION_TTL,
+        httponly=True, samesite="lax", secure=SESSION_COOKIE_SECURE,
+    )
+    return response
+
+@app.get("/logout")
+async def logout():
+    response = RedirectResponse(url="/login", status_code=303)
+    response.delete_cookie(SESSION_COOKIE)
+    return response
 
 
 @app.get("/book-categories", response_class=HTMLResponse)
-async def book_categories(request: Request, user: User = Depends(get_current_user)):
-    return templates.TemplateResponse("book_categories.html", {"request": request, "is_admin": user.is_admin})
+async def book_categories(request: Request, user: UserSnapshot = Depends(get_current_user)):
+    return static_page(request, "book_categories.html", user.is_admin)
 
 @app.get("/maintenance", response_class=HTMLResponse)
-async def maintenance_menu(request: Request, user: User = Depends(get_current_user)):
+async def maintenance_menu(request: Request, user: UserSnapshot = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return templates.TemplateResponse("maintenance_menu.html", {"request": request})
+    return static_page(request, "maintenance_menu.html", user.is_admin)
 
 @app.get("/reports", response_class=HTMLResponse)
-async def reports_menu(request: Request, user: User = Depends(get_current_user)):
-    return templates.TemplateResponse("reports_menu.html", {"request": request})
+async def reports_menu(request: Request, user: UserSnapshot = Depends(get_current_user)):
+    return static_page(request, "reports_menu.html", user.is_admin)
 
 @app.get("/transactions", response_class=HTMLResponse)
-async def transactions_menu(request: Request, user: User = Depends(get_current_user)):
-    return templates.TemplateResponse("transactions_menu.html", {"request": request})
+async def transactions_menu(request: Request, user: UserSnapshot = Depends(get_current_user)):
+    return static_page(request, "transactions_menu.html", user.is_admin)
 
 # Maintenance routes (admin only)
 @app.get("/maintenance/manage", response_class=HTMLResponse)
-async def maintenance_manage(request: Request, user: User = Depends(get_current_user)):
+async def maintenance_manage(request: Request, user: UserSnapshot = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return templates.TemplateResponse("maintenance_manage.html", {"request": request})
+    return static_page(request, "maintenance_manage.html", user.is_admin)
 
 @app.get("/maintenance/memberships", response_class=HTMLResponse)
-async def memberships_list(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def memberships_list(
+    request: Request,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    memberships = db.query(Membership).all()
-    return templates.TemplateResponse("memberships.html", {"request": request, "memberships": memberships})
+    page = keyset_page(db.query(Membership), Membership, MEMBERSHIP_SORT_KEYS, sort, after, before, limit)
+    return templates.TemplateResponse("memberships.html", {"request": request, "memberships": page.items, "page": page})
 
 @app.get("/maintenance/add-membership", response_class=HTMLResponse)
-async def add_membership_form(request: Request, user: User = Depends(get_current_user)):
+async def add_membership_form(request: Request, user: UserSnapshot = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return templates.TemplateResponse("add_membership.html", {"request": request})
+    return static_page(request, "add_membership.html", user.is_admin)
 
 @app.post("/maintenance/add-membership")
-async def add_membership(
+def add_membership(
     first_name: str = Form(...),
     last_name: str = Form(...),
     contact_name: str = Form(...),
@@ -175,7 +2413,7 @@ async def add_membership(
     aadhar_card: str = Form(...),
     membership_type: str = Form(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -201,12 +2439,15 @@ async def add_membership(
     )
     
     db.add(membership)
+    bump_counters(db, members=1)
     db.commit()
+    cached_member_search.cache_clear()
+    response_cache.bump("memberships")
     
     return RedirectResponse(url="/reports/master-memberships", status_code=303)
 
 @app.get("/maintenance/update-membership/{membership_id}", response_class=HTMLResponse)
-async def update_membership_form(membership_id: int, request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_membership_form(membership_id: int, request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -217,7 +2458,7 @@ async def update_membership_form(membership_id: int, request: Request, user: Use
     return templates.TemplateResponse("update_membership.html", {"request": request, "membership": membership})
 
 @app.post("/maintenance/update-membership/{membership_id}")
-async def update_membership(
+def update_membership(
     membership_id: int,
     first_name: str = Form(...),
     last_name: str = Form(...),
@@ -225,7 +2466,7 @@ async def update_membership(
     contact_address: str = Form(...),
     membership_type: str = Form(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -250,31 +2491,50 @@ async def update_membership(
     membership.membership_type = membership_type
     
     db.commit()
+    cached_member_search.cache_clear()
+    response_cache.bump("memberships")
     
     return RedirectResponse(url="/reports/master-memberships", status_code=303)
 
 @app.get("/maintenance/books", response_class=HTMLResponse)
-async def books_list(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def books_list(
+    request: Request,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    work_id: Optional[int] = None,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    books = db.query(Book).all()
-    return templates.TemplateResponse("books.html", {"request": request, "books": books})
+    query = db.query(Book)
+    work = None
+    if work_id is not None:
+        work = db.get(Work, work_id)
+        query = query.filter(Book.work_id == work_id)
+    page = keyset_page(query, Book, BOOK_SORT_KEYS, sort, after, before, limit)
+    return templates.TemplateResponse("books.html", {
+        "request": request, "books": page.items, "page": page, "work": work,
+        "page_query": f"&work_id={work_id}" if work_id is not None else "",
+    })
 
 @app.get("/maintenance/add-book", response_class=HTMLResponse)
-async def add_book_form(request: Request, user: User = Depends(get_current_user)):
+async def add_book_form(request: Request, user: UserSnapshot = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return templates.TemplateResponse("add_book.html", {"request": request})
+    return static_page(request, "add_book.html", user.is_admin)
 
 @app.post("/maintenance/add-book")
-async def add_book(
+def add_book(
     title: str = Form(...),
     author: str = Form(...),
     is_movie: bool = Form(False),
     genre: str = Form(...),
     serial_number: str = Form(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -288,7 +2548,12 @@ async def add_book(
     )
     
     db.add(book)
+    db.flush()
+    attach_copies(db)
+    assign_holds(db, [book.id])  # a new copy of a held title goes to its queue
+    bump_counters(db, **{"movies" if is_movie else "books": 1})
     db.commit()
+    response_cache.bump("books", "holds")
     
     if is_movie:
         return RedirectResponse(url="/reports/master-movies", status_code=303)
@@ -296,7 +2561,7 @@ async def add_book(
         return RedirectResponse(url="/reports/master-books", status_code=303)
 
 @app.get("/maintenance/update-book/{book_id}", response_class=HTMLResponse)
-async def update_book_form(book_id: int, request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_book_form(book_id: int, request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -307,14 +2572,14 @@ async def update_book_form(book_id: int, request: Request, user: User = Depends(
     return templates.TemplateResponse("update_book.html", {"request": request, "book": book})
 
 @app.post("/maintenance/update-book/{book_id}")
-async def update_book(
+def update_book(
     book_id: int,
     title: str = Form(...),
     author: str = Form(...),
     is_movie: bool = Form(False),
     genre: str = Form(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -323,46 +2588,103 @@ async def update_book(
     if not book:
         raise HTTPException(status_code=404, detail="Book/Movie not found")
     
+    if bool(book.is_movie) != is_movie:
+        bump_counters(db, books=1 if book.is_movie else -1, movies=1 if is_movie else -1)
+    
+    recatalogued = (book.title, book.author, bool(book.is_movie)) != (title, author, is_movie)
+    if recatalogued:
+        detach_copy(db, book)
+    
     book.title = title
     book.author = author
     book.is_movie = is_movie
     book.genre = genre
     
+    if recatalogued:
+        db.flush()
+        attach_copies(db)
+    elif book.work_id is not None:
+        db.execute(update(Work).where(Work.id == book.work_id).values(genre=genre))
+    
     db.commit()
+    response_cache.bump("books")
     
     if is_movie:
         return RedirectResponse(url="/reports/master-movies", status_code=303)
     else:
         return RedirectResponse(url="/reports/master-books", status_code=303)
 
+@app.post("/maintenance/import-books")
+def import_books_upload(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user)
+):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    file_format = file_format or ("jsonl" if (file.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv")
+    if file_format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Format must be csv or jsonl")
+    
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    report = import_books(db, read_catalogue(lines, file_format))
+    response_cache.bump("books", "holds")
+    return JSONResponse(report)
+
+@app.get("/maintenance/export/{table}")
+async def export_table(table: str, file_format: str = "csv", user: UserSnapshot = Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if table not in EXPORT_MODELS:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    if file_format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Format must be csv or jsonl")
+    
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(EXPORT_MODELS[table], file_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{file_format}"'},
+    )
+
 @app.get("/maintenance/users", response_class=HTMLResponse)
-async def users_list(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def users_list(
+    request: Request,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    users = db.query(User).all()
-    return templates.TemplateResponse("users.html", {"request": request, "users": users})
+    page = keyset_page(db.query(User), User, USER_SORT_KEYS, sort, after, before, limit)
+    return templates.TemplateResponse("users.html", {"request": request, "users": page.items, "page": page})
 
 @app.get("/maintenance/add-user", response_class=HTMLResponse)
-async def add_user_form(request: Request, user: User = Depends(get_current_user)):
+async def add_user_form(request: Request, user: UserSnapshot = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return templates.TemplateResponse("add_user.html", {"request": request})
+    return static_page(request, "add_user.html", user.is_admin)
 
 @app.post("/maintenance/add-user")
-async def add_user(
+def add_user(
     username: str = Form(...),
     password: str = Form(...),
     full_name: str = Form(...),
     is_admin: bool = Form(False),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     new_user = User(
         username=username,
-        password=password,
+        password=hash_password(password),
         full_name=full_name,
         is_admin=is_admin
     )
@@ -373,7 +2695,7 @@ async def add_user(
     return RedirectResponse(url="/reports/pending-issues", status_code=303)
 
 @app.get("/maintenance/update-user/{user_id}", response_class=HTMLResponse)
-async def update_user_form(user_id: int, request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_user_form(user_id: int, request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -384,14 +2706,14 @@ async def update_user_form(user_id: int, request: Request, user: User = Depends(
     return templates.TemplateResponse("update_user.html", {"request": request, "user_to_update": user_to_update})
 
 @app.post("/maintenance/update-user/{user_id}")
-async def update_user(
+def update_user(
     user_id: int,
     username: str = Form(...),
     full_name: str = Form(...),
     is_admin: bool = Form(False),
     password: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -400,187 +2722,422 @@ async def update_user(
     if not user_to_update:
         raise HTTPException(status_code=404, detail="User not found")
     
+    previous_username = user_to_update.username
     user_to_update.username = username
     user_to_update.full_name = full_name
     user_to_update.is_admin = is_admin
     
     if password:
-        user_to_update.password = password
+        user_to_update.password = hash_password(password)
     
     db.commit()
+    credential_cache.invalidate(previous_username, username)
+    session_revocations.revoke(previous_username, username)
     
     return RedirectResponse(url="/maintenance/users", status_code=303)
 
 # Reports routes (both user and admin)
+@app.get("/reports/summary")
+def report_summary(user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    return library_summary(db)
+
+@app.get("/admin", response_class=HTMLResponse)
+def admin_home(request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return templates.TemplateResponse("admin_home.html", {"request": request, "summary": library_summary(db)})
+
 @app.get("/reports/active-issues", response_class=HTMLResponse)
-async def active_issues(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def active_issues(request: Request, stream: bool = False, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    today = datetime.now().date()
+    if stream:
+        return stream_report(
+            "active_issues.html", {"request": request, "today": today}, "transactions",
+            open_transactions_query, Transaction, OPEN_LOAN_SORT_KEYS, "return_date",
+        )
+    return cached_page(
+        request, user, ("transactions", "books", "memberships"),
+        lambda: templates.TemplateResponse("active_issues.html", {"request": request, "transactions": open_transactions_report(db), "today": today}),
+        today,
+    )
+
+@app.get("/reports/member-history/{member_id}", response_class=HTMLResponse)
+def member_history(
+    request: Request,
+    member_id: int,
+    sort: str = "issue_date",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    def render():
+        member = db.get(Membership, member_id)
+        if not member:
+            raise HTTPException(status_code=404, detail="Member not found")
+        page = keyset_page(member_history_query(db, member_id), history.c, HISTORY_SORT_KEYS, sort, after, before, limit, descending=True)
+        return templates.TemplateResponse("member_history.html", {"request": request, "member": member, "transactions": page.items, "page": page})
+    return cached_page(request, user, ("transactions", "books", "memberships"), render)
+
+@app.get("/reports/analytics", response_class=HTMLResponse)
+def analytics(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = ANALYTICS_LIMIT,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     today = datetime.now().date()
-    active = db.query(Transaction).filter(Transaction.actual_return_date == None).all()
-    return templates.TemplateResponse("active_issues.html", {"request": request, "transactions": active, "today": today})
+    end = end or month_end(today)
+    start = start or add_months(end, -11)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    def render():
+        return templates.TemplateResponse("analytics.html", {
+            "request": request,
+            "start": start,
+            "end": end,
+            "top": {by: top_borrowed(db, by, start, end, limit) for by in ANALYTICS_GROUPS},
+            "fines": fines_by_month(db, start, end),
+        })
+    return cached_page(request, user, ("transactions", "books"), render, today)
 
 @app.get("/reports/master-memberships", response_class=HTMLResponse)
-async def master_memberships(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    memberships = db.query(Membership).all()
-    return templates.TemplateResponse("master_memberships.html", {"request": request, "memberships": memberships, "user": user})
+def master_memberships(
+    request: Request,
+    sort: str = "id",
+    stream: bool = False,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if stream:
+        if sort not in MEMBERSHIP_SORT_KEYS:
+            raise HTTPException(status_code=400, detail="Invalid sort key")
+        return stream_report(
+            "master_memberships.html", {"request": request, "user": user}, "memberships",
+            lambda stream_db: stream_db.query(Membership), Membership, MEMBERSHIP_SORT_KEYS, sort,
+        )
+    def render():
+        page = keyset_page(db.query(Membership), Membership, MEMBERSHIP_SORT_KEYS, sort, after, before, limit)
+        return templates.TemplateResponse("master_memberships.html", {"request": request, "memberships": page.items, "page": page, "user": user, "stream_all": True})
+    return cached_page(request, user, ("memberships",), render)
 
 @app.get("/reports/master-movies", response_class=HTMLResponse)
-async def master_movies(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    movies = db.query(Book).filter(Book.is_movie == True).all()
-    return templates.TemplateResponse("master_movies.html", {"request": request, "movies": movies, "user": user})
+def master_movies(
+    request: Request,
+    sort: str = "id",
+    stream: bool = False,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if stream:
+        if sort not in WORK_SORT_KEYS:
+            raise HTTPException(status_code=400, detail="Invalid sort key")
+        return stream_report(
+            "master_movies.html", {"request": request, "user": user}, "movies",
+            lambda stream_db: stream_db.query(Work).filter(Work.is_movie == True, Work.copies > 0), Work, WORK_SORT_KEYS, sort,
+        )
+    def render():
+        query = db.query(Work).filter(Work.is_movie == True, Work.copies > 0)
+        page = keyset_page(query, Work, WORK_SORT_KEYS, sort, after, before, limit)
+        return templates.TemplateResponse("master_movies.html", {"request": request, "movies": page.items, "page": page, "user": user, "stream_all": True})
+    return cached_page(request, user, ("books",), render)
 
 @app.get("/reports/master-books", response_class=HTMLResponse)
-async def master_books(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    books = db.query(Book).filter(Book.is_movie == False).all()
-    return templates.TemplateResponse("master_books.html", {"request": request, "books": books, "user": user})
+def master_books(
+    request: Request,
+    sort: str = "id",
+    stream: bool = False,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if stream:
+        if sort not in WORK_SORT_KEYS:
+            raise HTTPException(status_code=400, detail="Invalid sort key")
+        return stream_report(
+            "master_books.html", {"request": request, "user": user}, "books",
+            lambda stream_db: stream_db.query(Work).filter(Work.is_movie == False, Work.copies > 0), Work, WORK_SORT_KEYS, sort,
+        )
+    def render():
+        query = db.query(Work).filter(Work.is_movie == False, Work.copies > 0)
+        page = keyset_page(query, Work, WORK_SORT_KEYS, sort, after, before, limit)
+        return templates.TemplateResponse("master_books.html", {"request": request, "books": page.items, "page": page, "user": user, "stream_all": True})
+    return cached_page(request, user, ("books",), render)
 
 @app.get("/reports/overdue", response_class=HTMLResponse)
-async def overdue_returns(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def overdue_returns(request: Request, stream: bool = False, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     today = datetime.now().date()
-    overdue = db.query(Transaction).filter(Transaction.return_date < today, Transaction.actual_return_date == None).all()
+    if stream:
+        return stream_report(
+            "overdue.html", {"request": request, "today": today}, "transactions",
+            lambda stream_db: open_transactions_query(stream_db, overdue=True, today=today), Transaction, OPEN_LOAN_SORT_KEYS, "return_date",
+        )
+    overdue = open_transactions_report(db, overdue=True, today=today)
     return templates.TemplateResponse("overdue.html", {"request": request, "transactions": overdue, "today": today})
 
 @app.get("/reports/pending-issues", response_class=HTMLResponse)
-async def pending_issues(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # This would typically be a separate table for issue requests pending approval
-    # For simplicity, we'll simulate this with a dummy data approach
-    return templates.TemplateResponse("pending_issues.html", {"request": request, "pending_requests": []})
+def pending_issues(request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    return cached_page(request, user, ("holds",), lambda: templates.TemplateResponse(
+        "pending_issues.html", {"request": request, "pending_requests": open_holds(db)}
+    ))
 
 # Transactions routes (both user and admin)
 @app.get("/transactions/check-availability", response_class=HTMLResponse)
-async def check_availability_form(request: Request, user: User = Depends(get_current_user)):
-    return templates.TemplateResponse("check_availability.html", {"request": request})
+async def check_availability_form(request: Request, user: UserSnapshot = Depends(get_current_user)):
+    return static_page(request, "check_availability.html", user.is_admin)
 
 @app.post("/transactions/check-availability")
-async def check_availability(
+def check_availability(
+    request: Request,
     title: Optional[str] = Form(None),
     author: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     if not title and not author:
         return RedirectResponse(url="/transactions/check-availability?error=Please provide either title or author", status_code=303)
     
-    query = db.query(Book)
-    
-    if title:
-        query = query.filter(Book.title.like(f"%{title}%"))
-    
-    if author:
-        query = query.filter(Book.author.like(f"%{author}%"))
-    
-    books = query.all()
+    books = search_works(db, title=title, author=author)
     
     return templates.TemplateResponse(
         "availability_results.html", 
-        {"request": Request, "books": books}
+        {"request": request, "books": books}
     )
 
 @app.get("/transactions/issue-book", response_class=HTMLResponse)
-async def issue_book_form(request: Request, user: User = Depends(get_current_user), book_id: Optional[int] = None, db: Session = Depends(get_db)):
+def issue_book_form(
+    request: Request,
+    user: UserSnapshot = Depends(get_current_user),
+    book_id: Optional[int] = None,
+    work_id: Optional[int] = None,
+    member_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     book = None
     if book_id:
         book = db.query(Book).filter(Book.id == book_id).first()
+    elif work_id:
+        # Any free copy of the title; issue_copy still claims it atomically on submit
+        book = available_copy(db, work_id)
+        if book is None:
+            # None free: offer a hold on the copy due back first
+            book = (
+                db.query(Book)
+                .join(Transaction, and_(Transaction.book_id == Book.id, Transaction.actual_return_date == None))
+                .filter(Book.work_id == work_id)
+                .order_by(Transaction.return_date)
+                .first()
+            )
+    if book is None:
+        # The form issues one chosen copy; titles are picked on the availability search
+        error = "Book not found" if book_id else "No copies available" if work_id else "Search for a title to issue"
+        return RedirectResponse(url="/transactions/check-availability?" + urlencode({"error": error}), status_code=303)
+    member = db.get(Membership, member_id) if member_id else None
     
-    memberships = db.query(Membership).all()
     today_date = datetime.now().date()
     max_return_date = today_date + timedelta(days=15)
     
     return templates.TemplateResponse("issue_book.html", {
         "request": request, 
         "book": book, 
-        "memberships": memberships, 
+        "member": member,
         "today_date": today_date.strftime("%Y-%m-%d"),
         "max_return_date": max_return_date.strftime("%Y-%m-%d")
     })
 
+@app.get("/transactions/member-search")
+def member_search(q: str = "", user: UserSnapshot = Depends(get_current_user)):
+    """Autocomplete for the issue-book form: active members matching a name or Aadhar prefix."""
+    return list(cached_member_search(q.strip().lower(), date.today()))
+
 @app.post("/transactions/issue-book")
-async def issue_book(
+def issue_book(
     book_id: int = Form(...),
     member_id: int = Form(...),
     issue_date: str = Form(...),  # Format: YYYY-MM-DD
     return_date: str = Form(...),  # Format: YYYY-MM-DD
     remarks: Optional[str] = Form(None),
+    hold_if_unavailable: bool = Form(False),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
-    
-    if not book or book.status != "Available":
-        return RedirectResponse(url="/transactions/issue-book?error=Book not available", status_code=303)
-    
-    # Validate dates
     issue_date_obj = datetime.strptime(issue_date, "%Y-%m-%d").date()
     return_date_obj = datetime.strptime(return_date, "%Y-%m-%d").date()
-    today = datetime.now().date()
-    max_return_date = issue_date_obj + timedelta(days=15)
-    
-    if issue_date_obj < today:
-        return RedirectResponse(url="/transactions/issue-book?error=Issue date cannot be in the past", status_code=303)
-    
-    if return_date_obj > max_return_date:
-        return RedirectResponse(url="/transactions/issue-book?error=Return date cannot be more than 15 days from issue date", status_code=303)
-    
-    # Update book status
-    book.status = "Issued"
     
-    # Create transaction
-    transaction = Transaction(
-        book_id=book_id,
-        member_id=member_id,
-        issue_date=issue_date_obj,
-        return_date=return_date_obj,
-        remarks=remarks
-    )
+    try:
+        try:
+            issue_copy(db, book_id, member_id, issue_date_obj, return_date_obj, remarks)
+        except CopyUnavailable:
+            db.rollback()
+            # Another copy of the same title may be on the shelf; only if none is, queue for the title
+            book = db.get(Book, book_id)
+            spare = available_copy(db, book.work_id) if book is not None and book.work_id is not None else None
+            if spare is not None:
+                issue_copy(db, spare.id, member_id, issue_date_obj, return_date_obj, remarks)
+            elif hold_if_unavailable:
+                place_hold(db, book_id, member_id)
+                db.commit()
+                response_cache.bump("books", "holds")
+                return RedirectResponse(url="/reports/pending-issues", status_code=303)
+            else:
+                raise
+    except CirculationError as e:
+        db.rollback()
+        return RedirectResponse(url="/transactions/issue-book?" + urlencode({"book_id": book_id, "member_id": member_id, "error": str(e)}), status_code=303)
     
-    db.add(transaction)
     db.commit()
+    response_cache.bump("books", "transactions", "holds")
     
     return RedirectResponse(url="/reports/active-issues", status_code=303)
 
 @app.get("/transactions/return-book", response_class=HTMLResponse)
-async def return_book_form(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    active_transactions = db.query(Transaction).filter(Transaction.actual_return_date == None).all()
+def return_book_form(request: Request, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    active_transactions = open_transactions_report(db)
     today_date = datetime.now().date().strftime("%Y-%m-%d")
     return templates.TemplateResponse("return_book.html", {"request": request, "transactions": active_transactions, "today_date": today_date})
 
 @app.post("/transactions/return-book")
-async def return_book(
+def return_book(
     transaction_id: int = Form(...),
     actual_return_date: str = Form(...),  # Format: YYYY-MM-DD
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     
     if not transaction:
         return RedirectResponse(url="/transactions/return-book?error=Transaction not found", status_code=303)
     
+    if transaction.actual_return_date is not None:
+        return RedirectResponse(url="/transactions/return-book?error=Book already returned", status_code=303)
+    
     # Calculate fine if any (Rs. 10 per day)
     return_date = transaction.return_date
     actual_date = datetime.strptime(actual_return_date, "%Y-%m-%d").date()
     
-    if actual_date > return_date:
-        days_late = (actual_date - return_date).days
-        fine = days_late * 10.0  # Rs. 10 per day
+    fine = compute_fine(return_date, actual_date)
+    if fine:
         transaction.fine_amount = fine
     
     transaction.actual_return_date = actual_date
+    bump_open_loans(db, return_date, -1)
+    record_fines(db, actual_date, assessed=transaction.fine_amount)
+    bump_counters(db, fines_outstanding=transaction.fine_amount)
     
     # If there's a fine, redirect to fine payment
     if transaction.fine_amount > 0:
         db.commit()
+        response_cache.bump("transactions")
         return RedirectResponse(url=f"/transactions/pay-fine/{transaction.id}", status_code=303)
     
-    # Update book status
-    book = db.query(Book).filter(Book.id == transaction.book_id).first()
-    book.status = "Available"
+    # Update book status; the next hold on the copy, if any, gets it
+    release_copies(db, [transaction.book_id])
     
     db.commit()
+    response_cache.bump("books", "transactions", "holds")
     
     return RedirectResponse(url="/reports/active-issues", status_code=303)
 
+@app.post("/transactions/batch-return")
+def batch_return(batch: BatchReturnRequest, db: Session = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
+    results = return_copies(db, batch.items)
+    db.commit()
+    response_cache.bump("books", "transactions", "holds")
+    return {"results": results}
+
+@app.post("/transactions/batch-issue")
+def batch_issue(batch: BatchIssueRequest, db: Session = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
+    try:
+        results = issue_copies(db, batch)
+    except CirculationError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    response_cache.bump("books", "transactions")
+    return {"results": results}
+
+@app.post("/transactions/holds")
+def add_hold(
+    book_id: int = Form(...),
+    member_id: int = Form(...),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user)
+):
+    try:
+        place_hold(db, book_id, member_id)
+    except CirculationError as e:
+        db.rollback()
+        return RedirectResponse(url="/reports/pending-issues?" + urlencode({"error": str(e)}), status_code=303)
+    db.commit()
+    response_cache.bump("books", "holds")
+    return RedirectResponse(url="/reports/pending-issues", status_code=303)
+
+@app.post("/transactions/holds/{hold_id}/cancel")
+def cancel_hold(hold_id: int, db: Session = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
+    hold = db.get(Hold, hold_id)
+    if not hold:
+        return RedirectResponse(url="/reports/pending-issues?error=Hold not found", status_code=303)
+    try:
+        close_hold(db, hold)
+    except CirculationError as e:
+        db.rollback()
+        return RedirectResponse(url="/reports/pending-issues?" + urlencode({"error": str(e)}), status_code=303)
+    db.commit()
+    response_cache.bump("books", "holds")
+    return RedirectResponse(url="/reports/pending-issues", status_code=303)
+
+# Hold status is pushed as server-sent events. Each stream only compares the shared
+# "holds" version every HOLD_EVENTS_INTERVAL seconds (an in-memory read; shared_versions
+# polls the database at most once per CACHE_SYNC_INTERVAL for the whole process), and
+# re-reads the open holds through cached_open_holds, once per version per process, only
+# when it moved. Streams end after HOLD_EVENTS_MAX_AGE so a shutdown never waits on
+# them; EventSource reconnects by itself and is sent the current list first.
+HOLD_EVENTS_INTERVAL = float(os.environ.get("HOLD_EVENTS_INTERVAL", "1"))  # seconds
+HOLD_EVENTS_KEEPALIVE = 15  # seconds
+HOLD_EVENTS_MAX_AGE = float(os.environ.get("HOLD_EVENTS_MAX_AGE", "60"))  # seconds
+
+@app.get("/transactions/holds/events")
+async def hold_events(request: Request, member_id: Optional[int] = None, user: UserSnapshot = Depends(get_current_user)):
+    """A ``holds`` event with the open holds (one member's with ?member_id=) whenever they change."""
+    async def body():
+        yield "retry: 1000\n\n"
+        version = sent = None
+        started = quiet_since = time.monotonic()
+        while app_ready.is_set() and time.monotonic() - started < HOLD_EVENTS_MAX_AGE:
+            if await request.is_disconnected():
+                break
+            current = await asyncio.to_thread(shared_versions.get, "holds")
+            if current != version:
+                version = current
+                holds = await asyncio.to_thread(cached_open_holds, version)
+                if member_id is not None:
+                    holds = tuple(hold for hold in holds if hold["member_id"] == member_id)
+                if holds != sent:
+                    sent = holds
+                    yield f"event: holds\ndata: {json.dumps(holds)}\n\n"
+                    quiet_since = time.monotonic()
+            if time.monotonic() - quiet_since >= HOLD_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                quiet_since = time.monotonic()
+            await asyncio.sleep(HOLD_EVENTS_INTERVAL)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/transactions/pay-fine/{transaction_id}", response_class=HTMLResponse)
-async def pay_fine_form(request: Request, transaction_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def pay_fine_form(request: Request, transaction_id: int, user: UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     
     if not transaction:
@@ -589,32 +3146,350 @@ async def pay_fine_form(request: Request, transaction_id: int, user: User = Depe
     return templates.TemplateResponse("pay_fine.html", {"request": request, "transaction": transaction})
 
 @app.post("/transactions/pay-fine/{transaction_id}")
-async def pay_fine(
+def pay_fine(
     transaction_id: int,
     fine_paid: bool = Form(False),
     remarks: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     
     if not transaction:
         return RedirectResponse(url="/transactions/return-book?error=Transaction not found", status_code=303)
     
-    transaction.fine_paid = fine_paid
-    
-    if remarks:
-        transaction.remarks = remarks
-    
-    # Update book status only if fine is paid or there is no fine
-    if fine_paid or transaction.fine_amount == 0:
-        book = db.query(Book).filter(Book.id == transaction.book_id).first()
-        book.status = "Available"
-    
+    try:
+        settle_fine(db, transaction, fine_paid, remarks)
+    except CirculationError as e:
+        db.rollback()
+        return RedirectResponse(url="/transactions/return-book?" + urlencode({"error": str(e)}), status_code=303)
     db.commit()
+    response_cache.bump("books", "transactions", "holds")
     
     return RedirectResponse(url="/reports/active-issues", status_code=303)
 
+# JSON API
+# /api/v1 serves the same data and circulation rules as the HTML routes to kiosk and
+# mobile clients: plain JSON in, JSON out, no redirects. List endpoints page with the
+# same opaque cursors as the reports, take ?fields=a,b to trim each item, and are
+# compressed (brotli when the optional package is installed, else gzip) above
+# API_COMPRESS_MIN_SIZE bytes.
+API_COMPRESS_MIN_SIZE = 1024
+TRANSACTION_SORT_KEYS = {"id": Transaction.id, "issue_date": Transaction.issue_date, "return_date": Transaction.return_date}
+ARCHIVE_SORT_KEYS = {"id": TransactionArchive.id, "issue_date": TransactionArchive.issue_date, "return_date": TransactionArchive.return_date}
+
+class BookOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: Optional[str] = None
+    author: Optional[str] = None
+    is_movie: bool = False
+    genre: Optional[str] = None
+    serial_number: Optional[str] = None
+    status: Optional[str] = None
+    work_id: Optional[int] = None
+
+class WorkOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: Optional[str] = None
+    author: Optional[str] = None
+    is_movie: bool = False
+    genre: Optional[str] = None
+    copies: int = 0
+    available_count: int = 0
+
+class MemberOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    contact_name: Optional[str] = None
+    contact_address: Optional[str] = None
+    aadhar_card: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    membership_type: Optional[str] = None
+
+class TransactionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    book_id: int
+    member_id: int
+    issue_date: date
+    return_date: date
+    actual_return_date: Optional[date] = None
+    fine_amount: float = 0.0
+    fine_paid: bool = False
+    remarks: Optional[str] = None
+    accrued_fine: float = 0.0
+    is_overdue: bool = False
+
+class HoldOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    work_id: Optional[int] = None
+    book_id: int
+    member_id: int
+    created_at: datetime
+    status: str
+    ready_on: Optional[date] = None
+
+ItemT = TypeVar("ItemT")
+
+class ApiPage(BaseModel, Generic[ItemT]):
+    items: List[ItemT]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+class IssueRequest(BaseModel):
+    book_id: int
+    member_id: int
+    issue_date: date = Field(default_factory=date.today)
+    return_date: Optional[date] = None  # defaults to issue_date + LOAN_PERIOD_DAYS
+    remarks: Optional[str] = None
+
+class HoldRequest(BaseModel):
+    book_id: int
+    member_id: int
+
+class ReturnRequest(BaseModel):
+    actual_return_date: date = Field(default_factory=date.today)
+
+class PayFineRequest(BaseModel):
+    fine_paid: bool = True
+    remarks: Optional[str] = None
+
+def parse_fields(model, fields):
+    """Turn ``?fields=a,b`` into the include set for model_dump (None means every field)."""
+    if not fields:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected
+
+def accepted_encodings(request: Request):
+    encodings = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(name.strip().lower())
+    return encodings
+
+def api_response(request: Request, payload, status_code=200):
+    """Serialise with orjson and compress bodies over API_COMPRESS_MIN_SIZE when the client allows."""
+    response = ORJSONResponse(payload, status_code=status_code)
+    response.headers["Vary"] = "Accept-Encoding"
+    if len(response.body) < API_COMPRESS_MIN_SIZE:
+        return response
+    encodings = accepted_encodings(request)
+    if brotli is not None and "br" in encodings:
+        response.body = brotli.compress(response.body)
+        response.headers["Content-Encoding"] = "br"
+    elif "gzip" in encodings:
+        response.body = gzip.compress(response.body, compresslevel=6)
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Length"] = str(len(response.body))
+    return response
+
+def api_item(request: Request, model, obj, fields=None, status_code=200):
+    return api_response(request, model.model_validate(obj).model_dump(include=parse_fields(model, fields)), status_code)
+
+def api_page(request: Request, model, page: Page, fields=None):
+    include = parse_fields(model, fields)
+    return api_response(request, {
+        "items": [model.model_validate(row).model_dump(include=include) for row in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+
+api = APIRouter(prefix="/api/v1", tags=["api"], dependencies=[Depends(get_current_user)])
+
+@api.get("/books", response_model=ApiPage[BookOut])
+def api_books(
+    request: Request,
+    q: Optional[str] = None,
+    is_movie: Optional[bool] = None,
+    status: Optional[Literal["Available", "Issued", "On hold"]] = None,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    if q:
+        # Ranked full-text matches come back as a single page
+        books = [book for book in search_books(db, title=q, limit=max(1, min(limit, MAX_PAGE_SIZE)))
+                 if (is_movie is None or book.is_movie == is_movie) and (status is None or book.status == status)]
+        return api_page(request, BookOut, Page(books, None, None, sort, limit, list(BOOK_SORT_KEYS)), fields)
+    query = db.query(Book)
+    if is_movie is not None:
+        query = query.filter(Book.is_movie == is_movie)
+    if status is not None:
+        query = query.filter(Book.status == status)
+    return api_page(request, BookOut, keyset_page(query, Book, BOOK_SORT_KEYS, sort, after, before, limit), fields)
+
+@api.get("/books/{book_id}", response_model=BookOut)
+def api_book(request: Request, book_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    book = db.get(Book, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return api_item(request, BookOut, book, fields)
+
+@api.get("/works", response_model=ApiPage[WorkOut])
+def api_works(
+    request: Request,
+    q: Optional[str] = None,
+    is_movie: Optional[bool] = None,
+    available: bool = False,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Titles with their copy counters; ``q`` ranks by full-text match, ``available`` keeps titles with a free copy."""
+    def keep(work):
+        return (is_movie is None or work.is_movie == is_movie) and (not available or work.available_count > 0)
+
+    if q:
+        works = [work for work in search_works(db, title=q, limit=max(1, min(limit, MAX_PAGE_SIZE))) if keep(work)]
+        return api_page(request, WorkOut, Page(works, None, None, sort, limit, list(WORK_SORT_KEYS)), fields)
+    query = db.query(Work).filter(Work.copies > 0)
+    if is_movie is not None:
+        query = query.filter(Work.is_movie == is_movie)
+    if available:
+        query = query.filter(Work.available_count > 0)
+    return api_page(request, WorkOut, keyset_page(query, Work, WORK_SORT_KEYS, sort, after, before, limit), fields)
+
+@api.get("/members", response_model=ApiPage[MemberOut])
+def api_members(
+    request: Request,
+    q: Optional[str] = None,
+    active: bool = False,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(Membership)
+    condition = member_prefix_filter(q)
+    if condition is not None:
+        query = query.filter(condition)
+    if active:
+        query = query.filter(Membership.end_date >= date.today())
+    return api_page(request, MemberOut, keyset_page(query, Membership, MEMBERSHIP_SORT_KEYS, sort, after, before, limit), fields)
+
+@api.get("/members/{member_id}", response_model=MemberOut)
+def api_member(request: Request, member_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    member = db.get(Membership, member_id)
+    if not member:
+        raise HTTPException(status_code=404, detail="Membership not found")
+    return api_item(request, MemberOut, member, fields)
+
+@api.get("/transactions", response_model=ApiPage[TransactionOut])
+def api_transactions(
+    request: Request,
+    is_open: Optional[bool] = Query(None, alias="open"),
+    overdue: bool = False,
+    member_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    archived: bool = False,
+    sort: str = "id",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    model, sort_keys = (TransactionArchive, ARCHIVE_SORT_KEYS) if archived else (Transaction, TRANSACTION_SORT_KEYS)
+    query = db.query(model)
+    if is_open is not None:
+        query = query.filter(model.actual_return_date == None if is_open else model.actual_return_date != None)
+    if overdue:
+        query = query.filter(model.actual_return_date == None, model.return_date < date.today())
+    if member_id is not None:
+        query = query.filter(model.member_id == member_id)
+    if book_id is not None:
+        query = query.filter(model.book_id == book_id)
+    return api_page(request, TransactionOut, keyset_page(query, model, sort_keys, sort, after, before, limit), fields)
+
+@api.get("/transactions/{transaction_id}", response_model=TransactionOut)
+def api_transaction(request: Request, transaction_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    transaction = db.get(Transaction, transaction_id) or db.get(TransactionArchive, transaction_id)
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return api_item(request, TransactionOut, transaction, fields)
+
+@api.post("/transactions", response_model=TransactionOut, status_code=201)
+def api_issue(request: Request, issue: IssueRequest, db: Session = Depends(get_db)):
+    return_date = issue.return_date or issue.issue_date + timedelta(days=LOAN_PERIOD_DAYS)
+    try:
+        transaction = issue_copy(db, issue.book_id, issue.member_id, issue.issue_date, return_date, issue.remarks)
+    except CirculationError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    response_cache.bump("books", "transactions", "holds")
+    return api_item(request, TransactionOut, transaction, status_code=201)
+
+@api.post("/transactions/{transaction_id}/return", response_model=TransactionOut)
+def api_return(request: Request, transaction_id: int, body: ReturnRequest, db: Session = Depends(get_db)):
+    result, = return_copies(db, [BatchReturnItem(transaction_id=transaction_id, actual_return_date=body.actual_return_date)])
+    if result["status"] == "error":
+        db.rollback()
+        raise HTTPException(status_code=404 if result["error"] == "No open loan found" else 409, detail=result["error"])
+    db.commit()
+    response_cache.bump("books", "transactions", "holds")
+    return api_item(request, TransactionOut, db.get(Transaction, transaction_id))
+
+@api.post("/transactions/{transaction_id}/pay-fine", response_model=TransactionOut)
+def api_pay_fine(request: Request, transaction_id: int, body: PayFineRequest, db: Session = Depends(get_db)):
+    transaction = db.get(Transaction, transaction_id)
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    try:
+        settle_fine(db, transaction, body.fine_paid, body.remarks)
+    except CirculationError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    response_cache.bump("books", "transactions", "holds")
+    return api_item(request, TransactionOut, transaction)
+
+@api.post("/holds", response_model=HoldOut, status_code=201)
+def api_place_hold(request: Request, body: HoldRequest, db: Session = Depends(get_db)):
+    try:
+        hold = place_hold(db, body.book_id, body.member_id)
+    except CirculationError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    response_cache.bump("books", "holds")
+    return api_item(request, HoldOut, hold, status_code=201)
+
+@api.post("/holds/{hold_id}/cancel", response_model=HoldOut)
+def api_cancel_hold(request: Request, hold_id: int, db: Session = Depends(get_db)):
+    hold = db.get(Hold, hold_id)
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    try:
+        close_hold(db, hold)
+    except CirculationError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    response_cache.bump("books", "holds")
+    return api_item(request, HoldOut, hold)
+
+app.include_router(api)
+
 # Initialize database with admin user if it doesn't exist
 def init_db():
     print("Initializing database...")
@@ -626,7 +3501,7 @@ def init_db():
             print("Creating admin user")
             admin = User(
                 username="admin",
-                password="admin",
+                password=hash_password("admin"),
                 full_name="Administrator",
                 is_admin=True
             )
@@ -641,7 +3516,7 @@ def init_db():
             print("Creating regular user")
             regular_user = User(
                 username="user",
-                password="user",
+                password=hash_password("user"),
                 full_name="Regular User",
                 is_admin=False
             )
@@ -660,7 +3535,7 @@ def init_db():
     finally:
         db.close()
 
-# Run the app
+# Run the app in a single process; serve.py runs several workers
 if __name__ == "__main__":
     init_db()
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
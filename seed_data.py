@@ -0,0 +1,189 @@
+# seed_data.py
+# Fill an empty database with a synthetic but realistic catalogue, membership list
+# and loan history, for benchmarks and load tests.
+#
+#   python seed_data.py --scale 10k
+#   python seed_data.py --scale 1m --seed 7
+#   DATABASE_URL=sqlite:////tmp/big.db python seed_data.py --books 250000 --transactions 500000
+#
+# The same --seed always produces the same rows (relative to today's date). Loans
+# are a mix of closed history (some late, most fines paid) and open loans, a share
+# of them overdue. Copies are grouped into works (titles repeat, so most titles
+# have several copies); the dashboard counters, analytics rollups and overdue state are rebuilt at the end.
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from main import (
+    Base, Book, Membership, Transaction, SessionLocal, engine,
+    LOAN_PERIOD_DAYS, attach_copies, compute_fine, rebuild_report_counters, rebuild_rollups, sweep_overdue,
+)
+
+SCALES = {
+    "10k": {"books": 10_000, "members": 2_000, "transactions": 10_000},
+    "100k": {"books": 100_000, "members": 20_000, "transactions": 100_000},
+    "1m": {"books": 1_000_000, "members": 100_000, "transactions": 1_000_000},
+}
+CHUNK_SIZE = 10_000
+HISTORY_DAYS = 730
+
+TITLE_WORDS = [
+    "Silent", "River", "Garden", "Empire", "Shadow", "Monsoon", "Letters", "Winter", "Golden", "Night",
+    "Journey", "Island", "Memory", "Stone", "Fire", "City", "Forest", "Song", "Ocean", "Secret",
+    "Last", "Broken", "Paper", "Light", "House", "Mountain", "Storm", "Dream", "Glass", "Road",
+]
+FIRST_NAMES = [
+    "Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Sanjay", "Divya",
+    "Rahul", "Sneha", "Karan", "Pooja", "Amit", "Neha", "Ravi", "Isha", "Suresh", "Lakshmi",
+]
+LAST_NAMES = [
+    "Sharma", "Iyer", "Patel", "Reddy", "Gupta", "Nair", "Singh", "Das", "Mehta", "Rao",
+    "Kulkarni", "Joshi", "Menon", "Bose", "Chopra", "Pillai", "Verma", "Shetty", "Kapoor", "Agarwal",
+]
+GENRES = ["Fiction", "Mystery", "Science", "History", "Biography", "Children", "Poetry", "Drama", "Comedy", "Thriller"]
+MEMBERSHIP_DAYS = {"6 months": 180, "1 year": 365, "2 years": 730}
+
+def chunks(rows, size=CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+COPIES_PER_TITLE = 3  # on average
+
+def title_of(n):
+    """Title, author, type and genre of the n-th distinct work, derived from n so copies agree."""
+    words = [TITLE_WORDS[(n // 30 ** k) % 30] for k in range(2 + n % 3)]
+    author = f"{FIRST_NAMES[n % 20]} {LAST_NAMES[(n // 20) % 20]}"
+    return f"{' '.join(words)} {n}", author, n % 10 == 0, GENRES[(n // 7) % len(GENRES)]
+
+def book_rows(rng, count, issued):
+    titles = max(1, count // COPIES_PER_TITLE)
+    for i in range(count):
+        title, author, is_movie, genre = title_of(rng.randrange(titles))
+        yield {
+            "title": title,
+            "author": author,
+            "is_movie": is_movie,
+            "genre": genre,
+            "serial_number": f"{'MV' if is_movie else 'BK'}{i:09d}",
+            "status": "Issued" if i < issued else "Available",
+        }
+
+def member_rows(rng, count, today):
+    for i in range(count):
+        membership_type = rng.choice(list(MEMBERSHIP_DAYS))
+        start_date = today - timedelta(days=rng.randint(0, HISTORY_DAYS))
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "first_name": first_name,
+            "last_name": last_name,
+            "contact_name": f"{rng.choice(FIRST_NAMES)} {last_name}",
+            "contact_address": f"{rng.randint(1, 999)} {rng.choice(TITLE_WORDS)} Street",
+            "aadhar_card": f"{i + 1:012d}",
+            "start_date": start_date,
+            "end_date": start_date + timedelta(days=MEMBERSHIP_DAYS[membership_type]),
+            "membership_type": membership_type,
+        }
+
+def transaction_rows(rng, count, books, members, open_loans, today):
+    """Closed history over the last HISTORY_DAYS, then ``open_loans`` loans of books 1..open_loans."""
+    for i in range(count - open_loans):
+        issue_date = today - timedelta(days=rng.randint(LOAN_PERIOD_DAYS + 1, HISTORY_DAYS))
+        return_date = issue_date + timedelta(days=LOAN_PERIOD_DAYS)
+        late = rng.random() < 0.2
+        actual_return_date = return_date + timedelta(days=rng.randint(1, 30) if late else -rng.randint(0, 10))
+        fine = compute_fine(return_date, actual_return_date)
+        yield {
+            "book_id": rng.randint(open_loans + 1, books) if books > open_loans else rng.randint(1, books),
+            "member_id": rng.randint(1, members),
+            "issue_date": issue_date,
+            "return_date": return_date,
+            "actual_return_date": actual_return_date,
+            "fine_amount": fine,
+            "fine_paid": bool(fine) and rng.random() < 0.8,
+        }
+    for book_id in range(1, open_loans + 1):
+        issue_date = today - timedelta(days=rng.randint(0, 2 * LOAN_PERIOD_DAYS))
+        yield {
+            "book_id": book_id,
+            "member_id": rng.randint(1, members),
+            "issue_date": issue_date,
+            "return_date": issue_date + timedelta(days=LOAN_PERIOD_DAYS),
+            "actual_return_date": None,
+            "fine_amount": 0.0,
+            "fine_paid": False,
+        }
+
+def populate(bind, books, members, transactions, open_share=0.1, seed=42, today=None):
+    """Insert the synthetic data set into empty tables and return per-table timings."""
+    today = today or date.today()
+    rng = random.Random(seed)
+    open_loans = min(books, int(transactions * open_share))
+    Base.metadata.create_all(bind=bind)
+    with bind.connect() as conn:
+        existing = conn.execute(select(func.count(Book.id))).scalar() + conn.execute(select(func.count(Membership.id))).scalar()
+    if existing:
+        raise RuntimeError("books/memberships already contain rows; seed_data.py only fills an empty database")
+
+    timings = {}
+    for name, model, rows in (
+        ("books", Book, book_rows(rng, books, open_loans)),
+        ("memberships", Membership, member_rows(rng, members, today)),
+        ("transactions", Transaction, transaction_rows(rng, transactions, books, members, open_loans, today)),
+    ):
+        started = time.perf_counter()
+        for batch in chunks(rows):
+            with bind.begin() as conn:
+                conn.execute(insert(model), batch)
+        if model is Book:
+            with bind.begin() as conn:
+                attach_copies(conn)
+        timings[name] = round(time.perf_counter() - started, 2)
+
+    started = time.perf_counter()
+    with bind.begin() as conn:
+        rebuild_report_counters(conn)
+        rebuild_rollups(conn)
+    db = SessionLocal(bind=bind)
+    try:
+        sweep_overdue(db, today=today)
+    finally:
+        db.close()
+    timings["counters_and_sweep"] = round(time.perf_counter() - started, 2)
+    return {"books": books, "members": members, "transactions": transactions, "open_loans": open_loans, "seconds": timings}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic library data set in DATABASE_URL")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--books", type=int, help="override the scale's book count")
+    parser.add_argument("--members", type=int, help="override the scale's member count")
+    parser.add_argument("--transactions", type=int, help="override the scale's transaction count")
+    parser.add_argument("--open-share", type=float, default=0.1, help="fraction of transactions still on loan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    try:
+        result = populate(engine, **sizes, open_share=args.open_share, seed=args.seed)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps({"database_url": str(engine.url), "seed": args.seed, **result}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# serve.py
+# Run the app with several worker processes.
+#
+#   python serve.py                          # one worker per CPU core on 0.0.0.0:8000
+#   python serve.py --workers 4 --port 8080
+#   python serve.py --migrate-only           # migrate and seed, then exit (e.g. a deploy step)
+#
+# Importing main migrates the schema, so this process does it once and seeds the
+# default users; the workers are then started with RUN_MIGRATIONS=0 so they never
+# race on the DDL. The overdue sweep runs here in one thread instead of in every
+# worker. Workers share SESSION_SECRET (generated here when it is not set) so a
+# session cookie works whichever worker serves the request.
+#
+# uvicorn supervises the workers and restarts any that die. On SIGINT/SIGTERM it
+# stops accepting connections, /readyz starts answering 503, and requests in flight
+# get --graceful-timeout seconds to finish.
+#
+# Use DB_PROFILE=production with SQLite: WAL and busy_timeout let the workers'
+# writes queue instead of failing with "database is locked".
+
+import argparse
+import os
+import secrets
+import sys
+import threading
+
+import uvicorn
+
+import main
+
+def sweep_overdue_forever(interval, stop):
+    while not stop.is_set():
+        try:
+            updated = main.sweep_overdue_once()
+            if updated:
+                print(f"Overdue sweep updated {updated} loans")
+        except Exception as e:
+            print(f"Overdue sweep failed: {e}")
+        stop.wait(interval)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Migrate once, then serve the library app from several workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="defaults to the number of CPU cores")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds requests in flight get at shutdown")
+    parser.add_argument("--no-seed", action="store_true", help="skip creating the default admin/user accounts")
+    parser.add_argument("--migrate-only", action="store_true", help="migrate (and seed), then exit")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        main.init_db()
+    if args.migrate_only:
+        return 0
+
+    if main.engine.dialect.name == "sqlite" and main.DB_PROFILE == "default" and args.workers > 1:
+        print("Warning: several workers on SQLite without DB_PROFILE=production; writers may hit 'database is locked'")
+    if args.workers > 1 and main.CACHE_SYNC_INTERVAL <= 0:
+        print("Warning: CACHE_SYNC_INTERVAL=0 keeps cache invalidation inside each worker")
+
+    sweep_interval = main.OVERDUE_SWEEP_INTERVAL
+    os.environ["RUN_MIGRATIONS"] = "0"
+    os.environ["OVERDUE_SWEEP_INTERVAL"] = "0"
+    os.environ.setdefault("SESSION_SECRET", secrets.token_urlsafe(32))
+    # With --workers 1 uvicorn serves the main module already imported here, whose
+    # lifespan would otherwise start a second sweeper next to the thread below
+    main.OVERDUE_SWEEP_INTERVAL = 0
+
+    stop = threading.Event()
+    if sweep_interval > 0:
+        threading.Thread(
+            target=sweep_overdue_forever, args=(sweep_interval, stop), name="overdue-sweep", daemon=True
+        ).start()
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+        )
+    finally:
+        stop.set()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,70 @@
+# Point the app at a throwaway database before main is imported. Sweeps, the response
+# cache and cross-process version polling are off so every request runs the same
+# statements each time.
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import func, select
+
+DB_DIR = tempfile.mkdtemp(prefix="library-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'library.db')}"
+os.environ["OVERDUE_SWEEP_INTERVAL"] = "0"
+os.environ["CACHE_SYNC_INTERVAL"] = "0"
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["SESSION_SECRET"] = "tests"
+os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(DB_DIR, "templates")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+@pytest.fixture(scope="session")
+def client():
+    main.init_db()
+    with TestClient(main.app) as client:
+        client.auth = ("admin", "admin")
+        yield client
+
+@pytest.fixture
+def db():
+    session = main.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def read_counters(conn):
+    counters = dict(conn.execute(select(main.ReportCounter.name, main.ReportCounter.value)).all())
+    due = dict(conn.execute(select(main.OpenLoansByDueDate.return_date, main.OpenLoansByDueDate.open_loans)
+                            .where(main.OpenLoansByDueDate.open_loans != 0)).all())
+    available = dict(conn.execute(select(main.Work.id, main.Work.available_count)).all())
+    return counters, due, available
+
+def rebuilt_counters(conn):
+    """What rebuild_report_counters() would store now, and each work's copies on the shelf, without keeping it."""
+    with conn.begin() as transaction:
+        main.rebuild_report_counters(conn)
+        counters, due, _ = read_counters(conn)
+        transaction.rollback()
+    on_shelf = dict(conn.execute(
+        select(main.Work.id, func.count(main.Book.id))
+        .outerjoin(main.Book, (main.Book.work_id == main.Work.id) & (main.Book.status == "Available"))
+        .group_by(main.Work.id)
+    ).all())
+    return counters, due, on_shelf
+
+@pytest.fixture
+def counters_current(client):
+    """Rebuild the counters, then return a check that they still match a fresh rebuild."""
+    with main.engine.begin() as conn:
+        main.rebuild_report_counters(conn)
+
+    def check():
+        with main.engine.connect() as conn:
+            kept = read_counters(conn)
+        with main.engine.connect() as conn:
+            assert kept == rebuilt_counters(conn)
+    return check
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+@pytest.fixture
+def copy(client, db):
+    """A new copy and a new member; returns (book id, member id)."""
+    client.post("/maintenance/add-book", data={"title": "Api Loan", "author": "Kiosk", "genre": "Test", "serial_number": "API-1"})
+    client.post("/maintenance/add-membership", data={
+        "first_name": "Api", "last_name": "Member", "contact_name": "-", "contact_address": "-",
+        "aadhar_card": "API-1", "membership_type": "6 months",
+    })
+    book = db.query(main.Book).filter(main.Book.serial_number == "API-1").one()
+    member = db.query(main.Membership).filter(main.Membership.aadhar_card == "API-1").one()
+    return book.id, member.id
+
+def test_api_requires_credentials(client):
+    anonymous = TestClient(main.app)
+    assert anonymous.get("/api/v1/books").status_code == 401
+    anonymous.auth = ("admin", "wrong")
+    assert anonymous.get("/api/v1/books").status_code == 401
+    assert anonymous.post("/api/v1/transactions", json={"book_id": 1, "member_id": 1}).status_code == 401
+
+def test_issue_return_and_pay_round_trip(client, copy):
+    book_id, member_id = copy
+    today = date.today()
+    response = client.post("/api/v1/transactions", json={"book_id": book_id, "member_id": member_id, "return_date": str(today)})
+    assert response.status_code == 201
+    loan = response.json()
+    assert (loan["book_id"], loan["member_id"], loan["actual_return_date"]) == (book_id, member_id, None)
+    assert client.get(f"/api/v1/transactions/{loan['id']}").json() == loan
+    assert client.get(f"/api/v1/books/{book_id}?fields=status").json() == {"status": "Issued"}
+
+    # Out already, and the fine cannot be paid before the book is back
+    assert client.post("/api/v1/transactions", json={"book_id": book_id, "member_id": member_id}).status_code == 409
+    response = client.post(f"/api/v1/transactions/{loan['id']}/pay-fine", json={"fine_paid": True})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Book has not been returned"
+
+    response = client.post(f"/api/v1/transactions/{loan['id']}/return", json={"actual_return_date": str(today + timedelta(days=2))})
+    assert response.status_code == 200
+    assert (response.json()["fine_amount"], response.json()["fine_paid"]) == (20.0, False)
+    assert client.get(f"/api/v1/books/{book_id}?fields=status").json() == {"status": "Issued"}
+    assert client.post(f"/api/v1/transactions/{loan['id']}/return", json={}).status_code == 409
+
+    response = client.post(f"/api/v1/transactions/{loan['id']}/pay-fine", json={"fine_paid": True})
+    assert response.status_code == 200 and response.json()["fine_paid"] is True
+    assert client.get(f"/api/v1/books/{book_id}?fields=status").json() == {"status": "Available"}
+
+def test_missing_and_unknown_are_reported(client):
+    assert client.get("/api/v1/transactions/999999999").status_code == 404
+    assert client.post("/api/v1/transactions/999999999/pay-fine", json={}).status_code == 404
+    assert client.get("/api/v1/books?fields=nope").status_code == 400
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+
+import main
+
+def test_settled_old_loans_move_to_the_archive_and_stay_in_history(client, db):
+    today = date.today()
+    client.post("/maintenance/add-book", data={"title": "Archived Annals", "author": "Keeper", "genre": "Test", "serial_number": "ARC-1"})
+    client.post("/maintenance/add-membership", data={
+        "first_name": "Arch", "last_name": "Ive", "contact_name": "-", "contact_address": "-",
+        "aadhar_card": "ARC-1", "membership_type": "6 months",
+    })
+    book = db.query(main.Book).filter(main.Book.serial_number == "ARC-1").one()
+    member = db.query(main.Membership).filter(main.Membership.aadhar_card == "ARC-1").one()
+
+    def loan(days_ago, returned=True, fine=0.0, paid=False):
+        issued = today - timedelta(days=days_ago)
+        return db.execute(insert(main.Transaction).values(
+            book_id=book.id, member_id=member.id, issue_date=issued, return_date=issued + timedelta(days=7),
+            actual_return_date=issued + timedelta(days=9 if fine else 5) if returned else None,
+            fine_amount=fine, fine_paid=paid,
+        )).inserted_primary_key[0]
+
+    loans = {
+        "settled": loan(500),
+        "fine_paid": loan(450, fine=20.0, paid=True),
+        "fine_unpaid": loan(430, fine=20.0),
+        "open": loan(420, returned=False),
+        "recent": loan(30),
+    }
+    db.commit()
+    with main.engine.begin() as conn:
+        main.rebuild_report_counters(conn)
+
+    assert main.archive_transactions(db, today=today) >= 2
+    hot = set(db.execute(select(main.Transaction.id).where(main.Transaction.id.in_(loans.values()))).scalars())
+    archived = set(db.execute(select(main.TransactionArchive.id).where(main.TransactionArchive.id.in_(loans.values()))).scalars())
+    assert archived == {loans["settled"], loans["fine_paid"]}
+    assert hot == {loans["fine_unpaid"], loans["open"], loans["recent"]}
+
+    # Both halves of loan_history, through the member history query and page
+    history = db.execute(select(main.history.c.id).where(main.history.c.member_id == member.id)).scalars().all()
+    assert sorted(history) == sorted(loans.values())
+    page = main.keyset_page(main.member_history_query(db, member.id), main.history.c, main.HISTORY_SORT_KEYS, "issue_date", descending=True)
+    assert [row.id for row in page.items] == list(loans.values())[::-1]
+    text = client.get(f"/reports/member-history/{member.id}").text
+    assert str(today - timedelta(days=500)) in text and str(today - timedelta(days=450)) in text
+
+    # Analytics over a date range count archived loans too
+    start, end = today - timedelta(days=501), today
+    if start.day == 1:
+        start -= timedelta(days=1)  # not a whole-month range, so the loans are counted, not the rollup
+    top = {row.title: row.loans for row in main.top_borrowed(db, "title", start, end, limit=main.MAX_PAGE_SIZE)}
+    assert top["Archived Annals"] == 5
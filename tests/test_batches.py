@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+import main
+
+def loans_per_copy(db, books):
+    return dict(db.query(main.Transaction.book_id, func.count()).filter(main.Transaction.book_id.in_(books))
+                .group_by(main.Transaction.book_id))
+
+def test_batches_report_failures_per_item_and_apply_the_rest_once(client, db, counters_current):
+    today = date.today()
+    due = today + timedelta(days=7)
+    for i in range(3):
+        client.post("/maintenance/add-book", data={"title": "Batched", "author": "Dropbox", "genre": "Test", "serial_number": f"BAT-{i}"})
+    taken, first, second = [b.id for b in db.query(main.Book).filter(main.Book.title == "Batched").order_by(main.Book.id)]
+    client.post("/maintenance/add-membership", data={
+        "first_name": "Batch", "last_name": "Member", "contact_name": "-", "contact_address": "-",
+        "aadhar_card": "BAT", "membership_type": "6 months",
+    })
+    member = db.query(main.Membership).filter(main.Membership.aadhar_card == "BAT").one()
+    client.post("/transactions/issue-book", data={"book_id": taken, "member_id": member.id, "issue_date": str(today), "return_date": str(due)})
+
+    batch = {"member_id": member.id, "issue_date": str(today), "return_date": str(due), "items": [
+        {"book_id": taken}, {"book_id": first}, {"serial_number": "BAT-2"}, {"book_id": first}, {"serial_number": "BAT-missing"},
+    ]}
+    results = client.post("/transactions/batch-issue", json=batch).json()["results"]
+    assert [r["status"] for r in results] == ["error", "issued", "issued", "error", "error"]
+    assert [r.get("error") for r in results] == ["Book not available", None, None, "Duplicate item in batch", "Book not found"]
+    assert loans_per_copy(db, [taken, first, second]) == {taken: 1, first: 1, second: 1}
+    counters_current()
+
+    # Replaying the batch issues nothing twice
+    results = client.post("/transactions/batch-issue", json=batch).json()["results"]
+    assert all(r["status"] == "error" for r in results)
+    assert loans_per_copy(db, [taken, first, second]) == {taken: 1, first: 1, second: 1}
+    counters_current()
+
+    loan = {t.book_id: t.id for t in db.query(main.Transaction).filter(main.Transaction.book_id.in_([taken, first, second]))}
+    results = client.post("/transactions/batch-return", json={"items": [
+        {"transaction_id": loan[first], "actual_return_date": str(today)},
+        {"serial_number": "BAT-2", "actual_return_date": str(due + timedelta(days=3))},
+        {"transaction_id": 10**9, "actual_return_date": str(today)},
+        {"transaction_id": loan[first], "actual_return_date": str(today)},
+    ]}).json()["results"]
+    assert [(r["status"], r.get("fine_amount")) for r in results] == [
+        ("returned", 0.0), ("fine_due", 30.0), ("error", None), ("error", None),
+    ]
+    db.expire_all()
+    # The late copy stays out until its fine is paid
+    assert [db.get(main.Book, book_id).status for book_id in (taken, first, second)] == ["Issued", "Available", "Issued"]
+    counters_current()
+
+    results = client.post("/transactions/batch-return", json={"items": [{"transaction_id": loan[first], "actual_return_date": str(today)}]}).json()["results"]
+    assert results[0]["error"] == "Book already returned"
+    counters_current()
@@ -0,0 +1,43 @@
+# pytest-benchmark timings of the query and circulation paths in benchmark.py's
+# "queries" scenario, on a small seed_data.py data set in a database of their own:
+#
+#   python -m pytest tests/test_benchmarks.py --benchmark-autosave
+#   python -m pytest tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=median:20%
+#
+# Larger data sets and the HTTP routes stay with benchmark.py.
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import benchmark as benchmarks  # noqa: E402
+import main  # noqa: E402
+import seed_data  # noqa: E402
+
+SIZES = {"books": 2_000, "members": 400, "transactions": 2_000}
+ROUNDS = 10
+QUERIES = [
+    "search_books", "search_books_author", "search_works", "search_members",
+    "books_page_by_id", "works_page_by_title_deep", "books_page_by_title_deep", "memberships_page_by_name",
+    "member_history", "top_titles_whole_months", "top_genres_date_range", "fines_by_month",
+    "active_issues", "overdue", "library_summary", "sweep_overdue",
+    "issue_and_return", "return_to_hold", "open_holds",
+]
+
+@pytest.fixture(scope="module")
+def queries(tmp_path_factory):
+    engine = main.build_engine(f"sqlite:///{tmp_path_factory.mktemp('benchmarks') / 'library.db'}")
+    main.run_migrations(engine)
+    data = seed_data.populate(engine, **SIZES)
+    db = main.SessionLocal(bind=engine)
+    try:
+        yield benchmarks.query_benchmarks(db, data)
+    finally:
+        db.close()
+        engine.dispose()
+
+def test_every_query_benchmark_is_covered(queries):
+    assert sorted(queries) == sorted(QUERIES)
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query(benchmark, queries, name):
+    benchmark.pedantic(queries[name], rounds=ROUNDS, warmup_rounds=1)
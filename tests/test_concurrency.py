@@ -0,0 +1,58 @@
+import random
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+import main
+
+THREADS = 8
+COPIES = 6
+
+def test_concurrent_issues_of_the_same_copies_win_once_each(client, db):
+    today = date.today()
+    for i in range(COPIES):
+        client.post("/maintenance/add-book", data={"title": "Contended", "author": "Racer", "genre": "Test", "serial_number": f"RACE-{i}"})
+    books = [b.id for b in db.query(main.Book).filter(main.Book.title == "Contended")]
+    member = main.Membership(first_name="Race", last_name="Member", aadhar_card="RACE", start_date=today,
+                             end_date=today + timedelta(days=180), membership_type="6 months")
+    db.add(member)
+    db.commit()
+
+    barrier = threading.Barrier(THREADS)
+    wins = []
+    errors = []
+
+    def clerk():
+        order = random.sample(books, len(books))
+        barrier.wait()
+        for book_id in order:
+            session = main.SessionLocal()
+            try:
+                main.issue_copy(session, book_id, member.id, today, today + timedelta(days=7))
+                session.commit()
+                wins.append(book_id)
+            except (main.CirculationError, OperationalError):
+                session.rollback()
+            except Exception as e:  # surfaced below; a thread's exception would otherwise be lost
+                errors.append(e)
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=clerk) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(wins) == sorted(books)
+    loans = dict(db.query(main.Transaction.book_id, func.count()).filter(main.Transaction.book_id.in_(books))
+                 .group_by(main.Transaction.book_id))
+    assert loans == {book_id: 1 for book_id in books}
+    db.expire_all()
+    work = db.get(main.Work, db.get(main.Book, books[0]).work_id)
+    on_shelf = db.query(main.Book).filter(main.Book.work_id == work.id, main.Book.status == "Available").count()
+    assert work.copies == COPIES
+    assert work.available_count == on_shelf == 0
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+import main
+
+def test_circulation_keeps_counters_equal_to_a_rebuild(client, db, counters_current):
+    today = date.today()
+    client.post("/maintenance/add-book", data={"title": "Counted", "author": "Teller", "genre": "Test", "serial_number": "CNT-1"})
+    client.post("/maintenance/add-book", data={"title": "Counted Reel", "author": "Teller", "is_movie": "true", "genre": "Test", "serial_number": "CNT-2"})
+    client.post("/maintenance/add-membership", data={
+        "first_name": "Count", "last_name": "Keeper", "contact_name": "-", "contact_address": "-",
+        "aadhar_card": "CNT-1", "membership_type": "6 months",
+    })
+    counters_current()
+
+    member = db.query(main.Membership).filter(main.Membership.aadhar_card == "CNT-1").one()
+    books = [b.id for b in db.query(main.Book).filter(main.Book.serial_number.in_(["CNT-1", "CNT-2"])).order_by(main.Book.id)]
+    for book_id, days in zip(books, (0, 7)):
+        client.post("/transactions/issue-book", data={
+            "book_id": book_id, "member_id": member.id, "issue_date": str(today), "return_date": str(today + timedelta(days=days)),
+        })
+    counters_current()
+
+    late, on_time = (db.query(main.Transaction).filter(main.Transaction.book_id == book_id).one() for book_id in books)
+    response = client.post("/transactions/return-book", data={"transaction_id": late.id, "actual_return_date": str(today + timedelta(days=3))}, follow_redirects=False)
+    assert response.headers["location"] == f"/transactions/pay-fine/{late.id}"
+    client.post("/transactions/return-book", data={"transaction_id": on_time.id, "actual_return_date": str(today)})
+    counters_current()
+
+    client.post(f"/transactions/pay-fine/{late.id}", data={"fine_paid": "true"})
+    counters_current()
+    db.refresh(late)
+    assert late.fine_amount == 30.0
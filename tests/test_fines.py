@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from itertools import count
+
+import pytest
+
+import main
+
+titles = count()
+
+@pytest.fixture
+def copy(client, db):
+    """A single copy of a new title and two new members; returns (book id, member ids)."""
+    n = next(titles)
+    client.post("/maintenance/add-book", data={"title": f"Fined {n}", "author": "Payer", "genre": "Test", "serial_number": f"FN{n}"})
+    for i in range(2):
+        client.post("/maintenance/add-membership", data={
+            "first_name": f"Payer{i}", "last_name": f"F{n}", "contact_name": "-", "contact_address": "-",
+            "aadhar_card": f"FN{n}-{i}", "membership_type": "6 months",
+        })
+    book = db.query(main.Book).filter(main.Book.serial_number == f"FN{n}").one()
+    members = [m.id for m in db.query(main.Membership).filter(main.Membership.last_name == f"F{n}").order_by(main.Membership.id)]
+    return book.id, members
+
+def issue(client, db, book_id, member_id):
+    today = date.today()
+    client.post("/transactions/issue-book", data={
+        "book_id": book_id, "member_id": member_id, "issue_date": str(today), "return_date": str(today + timedelta(days=7)),
+    })
+    return db.query(main.Transaction).filter(main.Transaction.book_id == book_id, main.Transaction.actual_return_date == None).one()
+
+def status_of(db, book_id):
+    db.expire_all()
+    return db.get(main.Book, book_id).status
+
+def test_paying_an_open_loan_is_refused(client, db, copy):
+    book_id, (borrower, waiting) = copy
+    loan = issue(client, db, book_id, borrower)
+    client.post("/api/v1/holds", json={"book_id": book_id, "member_id": waiting})
+
+    response = client.post(f"/transactions/pay-fine/{loan.id}", data={"fine_paid": "true"}, follow_redirects=False)
+    assert "error=Book+has+not+been+returned" in response.headers["location"]
+    response = client.post(f"/api/v1/transactions/{loan.id}/pay-fine", json={"fine_paid": True})
+    assert response.status_code == 409
+
+    assert status_of(db, book_id) == "Issued"
+    assert [hold.status for hold in db.query(main.Hold).filter(main.Hold.member_id == waiting)] == ["Waiting"]
+
+def test_replayed_payment_does_not_release_a_reissued_copy(client, db, copy):
+    book_id, (first, second) = copy
+    loan = issue(client, db, book_id, first)
+    client.post("/transactions/return-book", data={"transaction_id": loan.id, "actual_return_date": str(date.today() + timedelta(days=9))})
+    assert status_of(db, book_id) == "Issued"  # out until the fine is paid
+    client.post(f"/transactions/pay-fine/{loan.id}", data={"fine_paid": "true"})
+    assert status_of(db, book_id) == "Available"
+
+    issue(client, db, book_id, second)
+    assert status_of(db, book_id) == "Issued"
+    client.post(f"/transactions/pay-fine/{loan.id}", data={"fine_paid": "true"})
+    client.post(f"/transactions/pay-fine/{loan.id}", data={"fine_paid": "false"})
+    client.post(f"/transactions/pay-fine/{loan.id}", data={"fine_paid": "true"})
+    assert status_of(db, book_id) == "Issued"
+    assert db.get(main.Work, db.get(main.Book, book_id).work_id).available_count == 0
+    # The copy stays with the second member, so it cannot be issued twice
+    assert "error" in client.post("/transactions/issue-book", data={
+        "book_id": book_id, "member_id": first, "issue_date": str(date.today()), "return_date": str(date.today()),
+    }, follow_redirects=False).headers["location"]
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from itertools import count
+
+import pytest
+from sqlalchemy import insert
+
+import main
+
+titles = count()
+
+@pytest.fixture
+def title(client):
+    """Three copies of a new title and three new members; returns (book ids, member ids)."""
+    n = next(titles)
+    today = date.today()
+    for i in range(3):
+        client.post("/maintenance/add-book", data={"title": f"Held {n}", "author": "Holder", "genre": "Test", "serial_number": f"H{n}-{i}"})
+    with main.engine.begin() as conn:
+        conn.execute(insert(main.Membership), [
+            {"first_name": f"Holder{i}", "last_name": f"T{n}", "aadhar_card": f"H{n}-{i}",
+             "start_date": today, "end_date": today + timedelta(days=180), "membership_type": "6 months"}
+            for i in range(3)
+        ])
+    db = main.SessionLocal()
+    try:
+        books = [b.id for b in db.query(main.Book).filter(main.Book.title == f"Held {n}").order_by(main.Book.id)]
+        members = [m.id for m in db.query(main.Membership).filter(main.Membership.last_name == f"T{n}").order_by(main.Membership.id)]
+    finally:
+        db.close()
+    return books, members
+
+def issue(client, book_id, member_id, hold=False):
+    today = date.today()
+    data = {"book_id": book_id, "member_id": member_id, "issue_date": str(today), "return_date": str(today + timedelta(days=7))}
+    if hold:
+        data["hold_if_unavailable"] = "true"
+    return client.post("/transactions/issue-book", data=data, follow_redirects=False)
+
+def loan_of(db, book_id):
+    return db.query(main.Transaction).filter(main.Transaction.book_id == book_id, main.Transaction.actual_return_date == None).one()
+
+def test_hold_is_refused_while_another_copy_is_on_the_shelf(client, title):
+    (first, _, _), (member, other, _) = title
+    assert issue(client, first, member).headers["location"] == "/reports/active-issues"
+    response = client.post("/api/v1/holds", json={"book_id": first, "member_id": other})
+    assert response.status_code == 409
+    assert "available" in response.json()["detail"]
+
+def test_issue_falls_back_to_another_copy_of_the_title(client, title, db):
+    (first, second, _), (member, other, _) = title
+    issue(client, first, member)
+    response = issue(client, first, other, hold=True)
+    assert response.headers["location"] == "/reports/active-issues"
+    assert loan_of(db, second).member_id == other
+    assert db.query(main.Hold).filter(main.Hold.member_id == other).count() == 0
+
+def test_returned_copy_goes_to_the_first_hold(client, title, db):
+    books, (first_member, second_member, third_member) = title
+    for book_id, member_id in zip(books, (first_member, first_member, first_member)):
+        issue(client, book_id, member_id)
+    assert issue(client, books[0], second_member, hold=True).headers["location"] == "/reports/pending-issues"
+    assert issue(client, books[0], third_member, hold=True).headers["location"] == "/reports/pending-issues"
+
+    client.post("/transactions/return-book", data={"transaction_id": loan_of(db, books[0]).id, "actual_return_date": str(date.today())})
+    db.expire_all()
+    assert db.get(main.Book, books[0]).status == "On hold"
+    holds = db.query(main.Hold).filter(main.Hold.work_id == db.get(main.Book, books[0]).work_id).order_by(main.Hold.id).all()
+    assert [(h.member_id, h.status, h.book_id) for h in holds] == [(second_member, "Ready", books[0]), (third_member, "Waiting", books[0])]
+
+    # The set-aside copy goes only to the member it is held for
+    assert "error" in issue(client, books[0], third_member).headers["location"]
+    assert issue(client, books[0], second_member).headers["location"] == "/reports/active-issues"
+
+def test_any_returned_copy_of_the_title_serves_the_hold(client, title, db):
+    books, (borrower, waiting, walk_in) = title
+    for book_id in books:
+        issue(client, book_id, borrower)
+    assert issue(client, books[0], waiting, hold=True).headers["location"] == "/reports/pending-issues"
+
+    # The hold was placed through copy 1, but copy 2 comes back first
+    client.post("/transactions/return-book", data={"transaction_id": loan_of(db, books[1]).id, "actual_return_date": str(date.today())})
+    db.expire_all()
+    assert [db.get(main.Book, book_id).status for book_id in books] == ["Issued", "On hold", "Issued"]
+    hold = db.query(main.Hold).filter(main.Hold.member_id == waiting).one()
+    assert (hold.status, hold.book_id) == ("Ready", books[1])
+    assert db.get(main.Work, hold.work_id).available_count == 0
+
+    assert "error" in issue(client, books[1], walk_in).headers["location"]
+    assert issue(client, books[1], waiting).headers["location"] == "/reports/active-issues"
+    db.expire_all()
+    assert hold.status == "Fulfilled"
+
+def test_a_new_copy_of_a_held_title_goes_to_the_queue(client, title, db):
+    books, (borrower, waiting, _) = title
+    for book_id in books:
+        issue(client, book_id, borrower)
+    issue(client, books[0], waiting, hold=True)
+    first = db.get(main.Book, books[0])
+    client.post("/maintenance/add-book", data={"title": first.title, "author": first.author, "genre": "Test", "serial_number": f"{first.serial_number}-new"})
+
+    db.expire_all()
+    new = db.query(main.Book).filter(main.Book.serial_number == f"{first.serial_number}-new").one()
+    hold = db.query(main.Hold).filter(main.Hold.member_id == waiting).one()
+    assert (new.status, hold.status, hold.book_id) == ("On hold", "Ready", new.id)
@@ -0,0 +1,49 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+import main
+
+TITLES = [None, "Dune", None, "Emma", "Dune", None, "Anna", "Zorba"]
+
+@pytest.fixture(scope="module")
+def paging_books(client):
+    with main.engine.begin() as conn:
+        conn.execute(insert(main.Book), [
+            {"title": title, "author": "Paging", "serial_number": f"PG{i}", "status": "Available"}
+            for i, title in enumerate(TITLES)
+        ])
+
+def walk(db, descending, limit=3):
+    """Every page forward from the start, then every page back from the last one."""
+    def page(**cursor):
+        return main.keyset_page(
+            db.query(main.Book).filter(main.Book.author == "Paging"), main.Book, main.BOOK_SORT_KEYS,
+            sort="title", limit=limit, descending=descending, **cursor,
+        )
+
+    pages = [page()]
+    while pages[-1].next_cursor:
+        pages.append(page(after=pages[-1].next_cursor))
+    back = [pages[-1]]
+    while back[-1].prev_cursor:
+        back.append(page(before=back[-1].prev_cursor))
+    return [[book.id for book in p.items] for p in pages], [[book.id for book in p.items] for p in reversed(back)]
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_cover_rows_with_null_sort_values(paging_books, db, descending):
+    books = db.query(main.Book).filter(main.Book.author == "Paging").all()
+    expected = [book.id for book in sorted(books, key=lambda book: (book.title is not None, book.title or "", book.id), reverse=descending)]
+    forward, backward = walk(db, descending)
+    assert sum(forward, []) == expected
+    assert sum(backward, []) == expected
+
+def test_tampered_date_cursor_is_rejected(client):
+    cursor = main.encode_cursor("x", 1)
+    response = client.get(f"/api/v1/members?sort=end_date&after={cursor}")
+    assert response.status_code == 400
+
+def test_cursor_with_invalid_date_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        main.decode_cursor(main.encode_cursor("2024-13-40", 1), date_value=True)
+    assert error.value.status_code == 400
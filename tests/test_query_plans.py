@@ -0,0 +1,50 @@
+# The report and circulation queries must keep reading through their indexes; these
+# tests EXPLAIN the statements the app actually runs, so an index that is renamed,
+# dropped or no longer chosen fails here.
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+import main
+
+@contextmanager
+def captured_selects():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(main.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(main.engine, "before_cursor_execute", record)
+
+def query_plan(statement, parameters):
+    with main.engine.connect() as conn:
+        return " | ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+
+def plan_of(run, table):
+    """The plan of the one SELECT ``run()`` sends that reads ``table``."""
+    with captured_selects() as statements:
+        run()
+    plans = [query_plan(statement, parameters) for statement, parameters in statements if f"FROM {table}" in statement]
+    assert len(plans) == 1, plans
+    return plans[0]
+
+def test_active_issues_use_open_loans_index(db):
+    plan = plan_of(lambda: main.open_transactions_query(db).all(), "transactions")
+    assert "ix_transactions_open_return_date" in plan
+
+def test_overdue_uses_open_loans_index(db):
+    plan = plan_of(lambda: main.open_transactions_query(db, overdue=True).all(), "transactions")
+    assert "ix_transactions_open_return_date" in plan
+
+def test_master_books_page_uses_works_index(client):
+    plan = plan_of(lambda: client.get("/reports/master-books?sort=title").raise_for_status(), "works")
+    assert "ix_works_is_movie_title" in plan
+
+def test_available_copy_uses_work_status_index(db):
+    plan = plan_of(lambda: main.available_copy(db, 1), "books")
+    assert "ix_books_work_id_status" in plan
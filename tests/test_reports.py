@@ -0,0 +1,125 @@
+# The open-loan reports read everything they show in one joined SELECT, so the number
+# of statements per request does not grow with the number of loans.
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import count
+
+from sqlalchemy import event, insert, select
+
+import main
+
+REPORT_URLS = ["/reports/active-issues", "/reports/overdue", "/transactions/return-book"]
+serials = count()
+
+@contextmanager
+def counted_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(main.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(main.engine, "before_cursor_execute", record)
+
+def add_open_loans(number):
+    """Lend ``number`` new copies to one new member; every other loan is already overdue."""
+    today = date.today()
+    with main.engine.begin() as conn:
+        member_id = conn.execute(insert(main.Membership).values(
+            first_name="Test", last_name=f"Member {next(serials)}", aadhar_card=f"T{next(serials)}",
+            start_date=today, end_date=today + timedelta(days=180), membership_type="6 months",
+        )).inserted_primary_key[0]
+        first = next(serials)
+        conn.execute(insert(main.Book), [
+            {"title": f"Report Test {i}", "author": "Tester", "genre": "Test", "serial_number": f"RT{first}-{i}", "status": "Issued"}
+            for i in range(number)
+        ])
+        main.attach_copies(conn)
+        book_ids = conn.execute(select(main.Book.id).where(main.Book.serial_number.like(f"RT{first}-%"))).scalars().all()
+        conn.execute(insert(main.Transaction), [
+            {
+                "book_id": book_id, "member_id": member_id,
+                "issue_date": today - timedelta(days=20 if i % 2 else 5),
+                "return_date": today - timedelta(days=5) if i % 2 else today + timedelta(days=10),
+                "fine_amount": 0.0, "fine_paid": False,
+            }
+            for i, book_id in enumerate(book_ids)
+        ])
+        main.rebuild_report_counters(conn)
+    main.response_cache.bump("books", "transactions", "memberships")
+    return book_ids
+
+def statement_counts(client):
+    counts = {}
+    for url in REPORT_URLS:
+        client.get(url)  # warm the credential cache and the compiled templates
+        with counted_statements() as statements:
+            assert client.get(url).status_code == 200
+        counts[url] = len(statements)
+    return counts
+
+def test_report_query_count_does_not_grow_with_loans(client):
+    loans = 20
+    add_open_loans(loans)
+    small = statement_counts(client)
+    add_open_loans(9 * loans)
+    large = statement_counts(client)
+    assert small == large, (small, large)
+    assert all(statements <= 3 for statements in large.values())
+
+def test_overdue_report_does_not_wait_for_the_sweep(client):
+    add_open_loans(2)  # one of them fell due five days ago and has never been swept
+    page = client.get("/reports/overdue").text
+    summary = client.get("/reports/summary").json()
+    assert page.count("<tr>") - 1 == summary["overdue"] > 0
+    assert "5 days" in page and "Rs. 50.0" in page
+    assert "Rs. 0.0" not in page
+    with main.engine.connect() as conn:
+        due_dates = conn.execute(select(main.Transaction.return_date).where(
+            main.Transaction.actual_return_date == None, main.Transaction.return_date < date.today()
+        )).scalars().all()
+    assert summary["fines_accruing"] == sum(main.compute_fine(due, date.today()) for due in due_dates)
+
+def test_sweep_overdue_persists_fines_in_batches(client, db):
+    book_ids = add_open_loans(6)
+    loans = db.query(main.Transaction).filter(main.Transaction.book_id.in_(book_ids))
+
+    main.sweep_overdue(db, batch_size=2)
+    assert sorted((loan.is_overdue, loan.accrued_fine) for loan in loans) == [(False, 0.0)] * 3 + [(True, 50.0)] * 3
+    assert main.sweep_overdue(db, batch_size=2) == 0
+
+    # A day later every overdue loan owes one more day
+    tomorrow = date.today() + timedelta(days=1)
+    overdue = db.query(main.Transaction).filter(main.Transaction.actual_return_date == None, main.Transaction.return_date < tomorrow).count()
+    assert main.sweep_overdue(db, today=tomorrow, batch_size=2) == overdue
+    db.expire_all()
+    assert sorted((loan.is_overdue, loan.accrued_fine) for loan in loans) == [(False, 0.0)] * 3 + [(True, 60.0)] * 3
+
+def test_issue_form_always_has_a_copy(client):
+    response = client.get("/transactions/issue-book", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"].startswith("/transactions/check-availability")
+
+    book_id = add_open_loans(1)[0]
+    response = client.post("/transactions/issue-book", data={
+        "book_id": book_id, "member_id": 1, "issue_date": "2000-01-01", "return_date": "2000-01-05",
+    }, follow_redirects=False)
+    assert f"book_id={book_id}" in response.headers["location"]
+    form = client.get(response.headers["location"])
+    assert f'name="book_id" value="{book_id}"' in form.text
+
+def test_issue_errors_reach_the_form_intact(client, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise main.CirculationError("Fines & fees #2 due; pay first")
+    monkeypatch.setattr(main, "issue_copy", refuse)
+
+    book_id = add_open_loans(1)[0]
+    response = client.post("/transactions/issue-book", data={
+        "book_id": book_id, "member_id": 1, "issue_date": str(date.today()), "return_date": str(date.today()),
+    }, follow_redirects=False)
+    form = client.get(response.headers["location"])
+    assert "Fines &amp; fees #2 due; pay first" in form.text
+    assert f'name="book_id" value="{book_id}"' in form.text
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import main
+from test_reports import counted_statements
+
+@pytest.fixture
+def page_cache(client, monkeypatch):
+    """A real page cache; the suite otherwise runs with RESPONSE_CACHE_SIZE=0."""
+    cache = main.LocalResponseCache(max_entries=64)
+    monkeypatch.setattr(main, "response_cache", cache)
+    return cache
+
+def test_writes_bump_the_version_and_retire_the_cached_page(client, page_cache):
+    # The one title sorting just before "Zzyzx Freshly Cached"; the new book becomes it
+    url = "/reports/master-books?sort=title&limit=1&before=" + main.encode_cursor("Zzyzx Freshly Cached~", 0)
+    first = client.get(url)
+    with counted_statements() as statements:
+        again = client.get(url)
+    assert statements == []
+    assert again.text == first.text and again.headers["etag"] == first.headers["etag"]
+
+    version = main.shared_versions.get("books")
+    client.post("/maintenance/add-book", data={"title": "Zzyzx Freshly Cached", "author": "Writer", "genre": "Test", "serial_number": "RC-1"})
+    assert main.shared_versions.get("books") == version + 1
+
+    after = client.get(url)
+    assert "Zzyzx Freshly Cached" in after.text and "Zzyzx Freshly Cached" not in first.text
+    assert after.headers["etag"] != first.headers["etag"]
+
+def test_matching_if_none_match_is_not_modified(client, page_cache):
+    etag = client.get("/reports/master-books").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/reports/master-books", headers={"If-None-Match": header})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get("/reports/master-books", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_shared_versions_pick_up_another_workers_bump(client):
+    writer = main.SharedVersions(interval=0.01)
+    reader = main.SharedVersions(interval=0.01)
+    seen = []
+    reader.on_change(lambda name, version: seen.append((name, version)))
+    reader.poll()
+    before = reader.get("worker-test")
+    seen.clear()
+
+    writer.bump("worker-test")
+    writer.set("user:worker-test", 1_900_000_000)
+    assert reader.get("worker-test") == before  # not until the next poll
+    time.sleep(0.02)
+    reader.poll()
+    assert reader.get("worker-test") == writer.get("worker-test") == before + 1
+    assert sorted(seen) == [("user:worker-test", 1_900_000_000), ("worker-test", before + 1)]
@@ -0,0 +1,36 @@
+import main
+
+def add_book(client, title, author, serial_number):
+    client.post("/maintenance/add-book", data={"title": title, "author": author, "genre": "Test", "serial_number": serial_number})
+
+def titles(db, **terms):
+    return sorted(book.title for book in main.search_books(db, **terms))
+
+def test_words_match_as_prefixes_in_any_order(client, db):
+    add_book(client, "Quixotic Marmalade Voyages", "Ottoline Brack", "FTS-1")
+    add_book(client, "Quixotic Gardens", "Ottoline Brack", "FTS-2")
+
+    assert titles(db, title="quix") == ["Quixotic Gardens", "Quixotic Marmalade Voyages"]
+    assert titles(db, title="voy quix") == ["Quixotic Marmalade Voyages"]
+    assert titles(db, title="quix", author="brack ott") == ["Quixotic Gardens", "Quixotic Marmalade Voyages"]
+    assert titles(db, title="quix garden", author="nobody") == []
+    assert [work.title for work in main.search_works(db, title="marm")] == ["Quixotic Marmalade Voyages"]
+
+def test_index_follows_book_updates(client, db):
+    add_book(client, "Brambleford Almanac", "Petronella Vask", "FTS-3")
+    book = db.query(main.Book).filter(main.Book.serial_number == "FTS-3").one()
+    client.post(f"/maintenance/update-book/{book.id}", data={"title": "Thistlewick Almanac", "author": "Petronella Vask", "genre": "Test"})
+    db.expire_all()
+
+    assert titles(db, title="brambleford") == []
+    assert titles(db, title="thistle alm") == ["Thistlewick Almanac"]
+
+def test_missing_index_is_rebuilt_from_the_catalogue(client, db):
+    add_book(client, "Weatherglass Sonnets", "Ignatius Pell", "FTS-4")
+    with main.engine.begin() as conn:
+        for trigger in ("books_fts_ai", "books_fts_ad", "books_fts_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        conn.exec_driver_sql("DROP TABLE books_fts")
+        main.create_search_index(conn)
+
+    assert titles(db, title="weatherg sonn") == ["Weatherglass Sonnets"]
@@ -0,0 +1,23 @@
+import sys
+import threading
+
+import main
+import serve
+
+def test_single_worker_runs_the_sweep_once(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["serve.py", "--workers", "1", "--no-seed"])
+    monkeypatch.setattr(main, "OVERDUE_SWEEP_INTERVAL", 900)
+    for name in ("RUN_MIGRATIONS", "OVERDUE_SWEEP_INTERVAL", "SESSION_SECRET"):
+        monkeypatch.setenv(name, "")
+    sweepers = []
+    monkeypatch.setattr(serve, "sweep_overdue_forever", lambda interval, stop: sweepers.append(interval))
+    served = []
+    monkeypatch.setattr(serve.uvicorn, "run", lambda app, **options: served.append((options["workers"], main.OVERDUE_SWEEP_INTERVAL)))
+
+    assert serve.main_cli() == 0
+    for thread in threading.enumerate():
+        if thread.name == "overdue-sweep":
+            thread.join(1)
+    # The launcher's thread sweeps; the in-process app's lifespan does not
+    assert sweepers == [900]
+    assert served == [(1, 0)]
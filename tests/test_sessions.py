@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+@pytest.fixture
+def clerk(client, db):
+    user = main.User(username="clerk", password=main.hash_password("old"), full_name="Clerk", is_admin=False)
+    db.add(user)
+    db.commit()
+    yield user
+    db.delete(user)
+    db.commit()
+    main.credential_cache.invalidate("clerk")
+
+def log_in(password):
+    browser = TestClient(main.app)
+    response = browser.post("/login", data={"username": "clerk", "password": password}, follow_redirects=False)
+    assert response.status_code == 303
+    return browser
+
+def test_password_change_in_the_same_second_ends_the_old_session(client, clerk, monkeypatch):
+    monkeypatch.setattr(main.time, "time", lambda: 1_800_000_000.25)
+    old_session = log_in("old")
+    assert old_session.get("/reports/summary").status_code == 200
+
+    response = client.post(f"/maintenance/update-user/{clerk.id}", data={
+        "username": "clerk", "full_name": "Clerk", "password": "new",
+    }, follow_redirects=False)
+    assert response.status_code == 303
+
+    assert old_session.get("/reports/summary", follow_redirects=False).status_code != 200
+    new_session = log_in("new")
+    assert new_session.get("/reports/summary").status_code == 200
+
+def basic(password):
+    browser = TestClient(main.app)
+    browser.auth = ("clerk", password)
+    return browser
+
+def update_clerk(client, clerk, **fields):
+    data = {"username": "clerk", "full_name": "Clerk", **fields}
+    assert client.post(f"/maintenance/update-user/{clerk.id}", data=data, follow_redirects=False).status_code == 303
+
+def test_password_change_invalidates_the_cached_credential(client, clerk):
+    assert basic("old").get("/reports/summary").status_code == 200
+    assert main.credential_cache.get("clerk", "old") is not None
+
+    update_clerk(client, clerk, password="new")
+    assert main.credential_cache.get("clerk", "old") is None
+    assert basic("old").get("/reports/summary").status_code == 401
+    assert basic("new").get("/reports/summary").status_code == 200
+
+def test_update_user_refreshes_the_cached_snapshot(client, clerk):
+    assert basic("old").get("/maintenance/users").status_code == 403
+
+    update_clerk(client, clerk, is_admin="true")
+    assert basic("old").get("/maintenance/users").status_code == 200
+
+def test_wrong_password_is_not_served_from_the_cache(client, clerk):
+    assert basic("old").get("/reports/summary").status_code == 200
+    assert basic("wrong").get("/reports/summary").status_code == 401
+    assert main.credential_cache.get("clerk", "wrong") is None
@@ -0,0 +1,63 @@
+# Streamed responses are read by the client at its own pace; between chunks they must
+# not hold a read lock, or every write (issue, return, pay fine) fails with
+# "database is locked" under the default rollback-journal profile.
+import asyncio
+import csv
+import io
+import sqlite3
+
+import pytest
+from sqlalchemy import insert
+
+import main
+
+@pytest.fixture(scope="module")
+def books(client):
+    with main.engine.begin() as conn:
+        conn.execute(insert(main.Book), [
+            {"title": f"Stream {i}", "author": "Streamer", "serial_number": f"ST{i}", "status": "Available"}
+            for i in range(25)
+        ])
+
+def write_now():
+    """Commit a write from another connection, failing at once if the database is locked."""
+    conn = sqlite3.connect(main.engine.url.database, timeout=0.1)
+    try:
+        conn.execute("UPDATE books SET genre = genre WHERE serial_number = 'ST0'")
+        conn.commit()
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("file_format", ["csv", "jsonl"])
+def test_export_does_not_block_writers_between_batches(books, file_format):
+    chunks = main.export_rows(main.Book, file_format, batch_size=5)
+    body = next(chunks) + next(chunks)
+    write_now()
+    body += "".join(chunks)
+    if file_format == "csv":
+        rows = list(csv.DictReader(io.StringIO(body)))
+    else:
+        rows = [line for line in body.splitlines() if line]
+    with main.engine.connect() as conn:
+        assert len(rows) == conn.exec_driver_sql("SELECT count(*) FROM books").scalar()
+
+def test_streamed_report_does_not_block_writers_between_batches(books, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_BATCH_SIZE", 5)
+    monkeypatch.setattr(main, "STREAM_BUFFER", 2)
+    response = main.stream_report(
+        "master_books.html", {"request": None, "user": None}, "books",
+        lambda db: db.query(main.Book).filter(main.Book.author == "Streamer"), main.Book, main.BOOK_SORT_KEYS, "title",
+    )
+
+    async def read():
+        chunks = response.body_iterator
+        body = await anext(chunks)
+        while "Stream 7" not in body:
+            body += await anext(chunks)
+        write_now()
+        async for chunk in chunks:
+            body += chunk
+        return body
+
+    body = asyncio.run(read())
+    assert [f"Stream {i}" in body for i in range(25)] == [True] * 25